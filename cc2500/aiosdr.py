@@ -0,0 +1,119 @@
+import asyncio
+import queue
+
+from . import sdr
+from .pipeline import QueueReader, SampleAligner, BLOCK_SIZE, QUEUE_SIZE
+
+class AsyncReceiver:
+	"""Asynchronous iterator of the (addr, payload) packets received live with rtl_fm
+
+	rtl_fm is started with asyncio.create_subprocess_exec() and its output is
+	read on the event loop, while detection runs in executor (by default, the
+	loop's default executor). Sample blocks that detection can't keep up with
+	are dropped and counted in overruns.
+
+	Use as an async context manager, or call aclose() when done, to shut down
+	rtl_fm and the detection worker, also when the consuming task is cancelled:
+
+		async with AsyncReceiver(conf, sdr_conf) as rx:
+			async for addr, payload in rx:
+				...
+	"""
+	def __init__(self, conf, sdr_conf, fm=None, engine=None, stats=None, executor=None, queue_size=QUEUE_SIZE):
+		self.conf = conf
+		self.sdr = sdr_conf
+		self.fm = fm or sdr.get_decoder(conf).fm
+		self.engine = engine
+		self.stats = stats
+		self.executor = executor
+		self.queue_size = queue_size
+
+		self.proc = None
+		self.overruns = 0
+
+	async def start(self):
+		loop = asyncio.get_running_loop()
+		self.proc = await asyncio.create_subprocess_exec(*sdr.fm_stream_args(self.sdr, self.fm), stdout=asyncio.subprocess.PIPE)
+
+		self.samples = queue.Queue(self.queue_size)
+		self.packets = asyncio.Queue()
+		self.reader = asyncio.ensure_future(self._read())
+		self.detector = loop.run_in_executor(self.executor, self._detect, loop)
+
+	async def _read(self):
+		align = SampleAligner()
+		try:
+			while True:
+				data = await self.proc.stdout.read(BLOCK_SIZE)
+				if not data:
+					break
+				data = align(data)
+				if not data:
+					continue
+
+				try:
+					self.samples.put_nowait(data)
+				except queue.Full:
+					self.overruns += 1
+		finally:
+			self._end_samples()
+
+	def _end_samples(self):
+		# Make room for the end marker if detection has fallen behind
+		while True:
+			try:
+				self.samples.put_nowait(None)
+				break
+			except queue.Full:
+				try:
+					self.samples.get_nowait()
+				except queue.Empty:
+					pass
+
+	def _detect(self, loop):
+		def put(packet):
+			try:
+				loop.call_soon_threadsafe(self.packets.put_nowait, packet)
+			except RuntimeError:
+				# Event loop already closed
+				pass
+
+		samples = sdr.RawSamples(QueueReader(self.samples), 2, 'little', True)
+		try:
+			for packet in sdr.parse_stream(samples, self.conf, self.sdr, self.fm, self.engine, self.stats):
+				put(packet)
+		finally:
+			put(None)
+
+	def __aiter__(self):
+		return self
+
+	async def __anext__(self):
+		if self.proc is None:
+			await self.start()
+
+		packet = await self.packets.get()
+		if packet is None:
+			await self.aclose()
+			raise StopAsyncIteration
+
+		return packet
+
+	async def __aenter__(self):
+		await self.start()
+		return self
+
+	async def __aexit__(self, *exc):
+		await self.aclose()
+
+	async def aclose(self):
+		if self.proc is None:
+			return
+
+		if self.proc.returncode is None:
+			self.proc.terminate()
+			await self.proc.wait()
+
+		# The reader finishes on EOF from rtl_fm, which also ends detection
+		await self.reader
+		await self.detector
@@ -0,0 +1,363 @@
+import collections
+import subprocess
+import time
+import sys
+
+import numpy as np
+
+from . import config
+from . import parse
+from . import sdr
+from . import gen
+from . import control
+from . import sim
+
+class Timer:
+	"""Accumulates wall clock and CPU time of the stages run under it"""
+	def __init__(self):
+		self.stages = {}
+
+	def __call__(self, name):
+		self.name = name
+		return self
+
+	def __enter__(self):
+		self.start = (time.perf_counter(), time.process_time())
+
+	def __exit__(self, *exc):
+		wall, cpu = self.stages.get(self.name, (0, 0))
+		self.stages[self.name] = (wall + time.perf_counter() - self.start[0], cpu + time.process_time() - self.start[1])
+
+	def format(self):
+		return '\n'.join('  %-24s %9.3f s wall %9.3f s cpu' % (name, wall, cpu) for name, (wall, cpu) in self.stages.items())
+
+def decode_yield(sent, received):
+	"""Fraction of the sent payloads found in the received packets"""
+	found = collections.Counter(sent) & collections.Counter(payload for addr, payload in received)
+	return sum(found.values()) / len(sent) if sent else 0
+
+def bench_parse_stream(conf, payloads, timer, sps=4, noise=0, dc=0, drift=0, gap=64, engines=None, seed=0, name='parse_stream'):
+	"""Decode rendered samples of the payloads with each engine; realtime is the decoding speed relative to the sample rate"""
+	encode, encode_many = parse.make_encoder(conf)
+	with timer('build frames'):
+		frames = [encode(payload) for payload in payloads]
+	with timer('render samples'):
+		samples = gen.render(frames, sps, noise=noise, dc=dc, drift=drift, gap=gap, seed=seed)
+
+	fm = gen.fm_conf(conf, sps)
+	results = {}
+	for engine in engines or sorted(sdr.engines):
+		stream = gen.sample_stream(samples)
+		with timer('%s[%s]' % (name, engine)):
+			start = time.perf_counter(), time.process_time()
+			received = list(sdr.parse_stream(stream, conf, sdr.SDRConfig(), fm, engine))
+			wall, cpu = time.perf_counter() - start[0], time.process_time() - start[1]
+
+		results[engine] = {
+			'samples': len(samples),
+			'packets': len(received),
+			'yield': decode_yield(payloads, received),
+			'samples/s': len(samples) / wall,
+			'realtime': len(samples) / wall / fm.resamplerate,
+			'packets/s': len(received) / wall,
+			'cpu ns/sample': cpu / len(samples) * 1e9,
+		}
+
+	return results
+
+def bench_parser(conf, payloads, timer, repeat=10, name='make_parser'):
+	encode, encode_many = parse.make_encoder(conf)
+	frames = [encode(payload) for payload in payloads]
+	base_size, parse_packet = parse.make_parser(conf)
+
+	with timer(name + ' parse'):
+		start = time.perf_counter()
+		for i in range(repeat):
+			for frame in frames:
+				parse_packet(frame)
+		wall = time.perf_counter() - start
+
+	return {'packets/s': repeat * len(frames) / wall, 'bytes/s': repeat * sum(map(len, frames)) / wall}
+
+def bench_batch_parser(conf, payloads, rng, timer, repeat=10, errors=0.002, truncate=0.1):
+	"""Compare make_batch_parser() against make_parser() over frames with random bit errors and truncations
+
+	agree is the fraction of frames given the same status by both. A
+	truncated frame that passes the header checks has make_parser() fail
+	the CRC check, run out of data or, without a CRC, return what's left
+	of the payload, where the batch parser reports it as short.
+	"""
+	encode, encode_many = parse.make_encoder(conf)
+	frames = []
+	for payload in payloads:
+		frame = np.frombuffer(encode(payload), dtype=np.uint8)
+		flips = rng.random(len(frame) * 8) < errors
+		frame = (frame ^ np.packbits(flips)).tobytes()
+		if rng.random() < truncate:
+			frame = frame[:rng.integers(len(frame))]
+		frames.append(frame)
+	base_size, parse_packet = parse.make_parser(conf)
+	base_size, parse_batch = parse.make_batch_parser(conf)
+
+	reference = []
+	with timer('make_batch_parser reference'):
+		start = time.perf_counter()
+		for frame in frames:
+			try:
+				parse_packet(frame)
+				reference.append(parse.STATUS_OK)
+			except parse.ParseError as e:
+				reference.append(parse.STATUS_NAMES.index(e.reason))
+			except IndexError:
+				reference.append(None)
+		reference_wall = time.perf_counter() - start
+
+	array, lengths = parse.frame_array(frames)
+	with timer('make_batch_parser'):
+		start = time.perf_counter()
+		for i in range(repeat):
+			parsed = parse_batch(array, lengths)
+		wall = (time.perf_counter() - start) / repeat
+
+	agree = sum(status == expected or (status == parse.STATUS_SHORT and expected in (parse.STATUS_OK, parse.STATUS_CRC, None))
+		for status, expected in zip(parsed.status.tolist(), reference))
+
+	return {
+		'packets/s': len(frames) / wall,
+		'speedup': reference_wall / wall,
+		'valid': float((parsed.status == parse.STATUS_OK).mean()),
+		'agree': agree / len(frames),
+	}
+
+def bench_fec(rng, timer, count=100, size=64, errors=0.01):
+	"""Compare the vectorized FEC decoder against the scalar reference"""
+	data = [rng.integers(0, 256, size, dtype=np.uint8).tobytes() for i in range(count)]
+	encoded = np.array([np.frombuffer(parse.fec_encode(item), dtype=np.uint8) for item in data])
+
+	# Flip random bits
+	flips = rng.random((encoded.shape[0], encoded.shape[1] * 8)) < errors
+	encoded ^= np.packbits(flips, axis=1)
+
+	with timer('fec_decode_reference'):
+		start = time.perf_counter()
+		reference = [parse.fec_decode_reference(frame.tobytes()) for frame in encoded]
+		reference_wall = time.perf_counter() - start
+
+	with timer('fec_decode'):
+		start = time.perf_counter()
+		decoded = parse.fec_decode(encoded)
+		wall = time.perf_counter() - start
+
+	# One frame at a time, as when parsing packets
+	with timer('fec_decode single'):
+		start = time.perf_counter()
+		single = [parse.fec_decode(frame.tobytes()) for frame in encoded]
+		single_wall = time.perf_counter() - start
+
+	assert [row.tobytes() for row in decoded] == reference == single
+	correct = sum(row.tobytes()[:size] == item for row, item in zip(decoded, data))
+
+	return {
+		'frames/s': count / wall,
+		'single frames/s': count / single_wall,
+		'reference frames/s': count / reference_wall,
+		'speedup': reference_wall / wall,
+		'single speedup': reference_wall / single_wall,
+		'corrected': correct / count,
+	}
+
+# Best cumulative import times in ms, as measured once the heavy imports were deferred;
+# bench_import() flags the modules taking over IMPORT_TOLERANCE times as long
+IMPORT_BASELINE_MS = {'config': 5.5, 'parse': 7.5, 'sdr': 12.5, 'control': 15.5}
+IMPORT_TOLERANCE = 1.5
+
+def bench_import(modules=('config', 'parse', 'sdr', 'control'), repeat=5):
+	"""Best of repeat cumulative import times of cc2500 modules, in fresh interpreters
+
+	Also reports whether importing the module pulled in NumPy, which should
+	only be imported once it's actually used, whether it's slower than its
+	IMPORT_BASELINE_MS allows, and whether the generated register tables
+	are up to date (without which importing config parses reg_data).
+	"""
+	results = {}
+	out = subprocess.run([sys.executable, '-m', 'cc2500.config', '--check-tables'], stdout=subprocess.PIPE)
+	results['tables ok'] = out.returncode == 0
+	for module in modules:
+		name = 'cc2500.' + module
+		best = None
+		for i in range(repeat):
+			out = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + name], stderr=subprocess.PIPE, check=True).stderr.decode()
+			imported = {line.split('|')[2].strip(): int(line.split('|')[1]) for line in out.splitlines()[1:] if line.startswith('import time:')}
+			if best is None or imported[name] < best:
+				best = imported[name]
+		results[module + ' ms'] = best / 1000
+		results[module + ' numpy'] = 'numpy' in imported
+		results[module + ' slow'] = best / 1000 > IMPORT_BASELINE_MS.get(module, float('inf')) * IMPORT_TOLERANCE
+
+	return results
+
+def sim_frame(conf, payload):
+	"""Payload as the simulated chip should receive it, with the length and address bytes"""
+	if conf.field.ADR_CHK:
+		payload = bytes([conf.field.DEVICE_ADDR]) + payload
+	if conf.field.LENGTH_CONFIG == 1:
+		payload = bytes([len(payload)]) + payload
+	return payload
+
+def bench_control(conf, payloads, timer, baudrate=2000000, latency=0.001, gap=0.02):
+	"""Run CC2500Control against a simulated chip and serial bridge
+
+	Reports the time and round trips taken by initialize(), tx() of the
+	payloads that fit the TX FIFO, tx_stream() of all of them, and
+	receiving the payloads with rx_many() when they are put on the air gap
+	seconds apart. link/air is the rate of the serial link relative to
+	the air rate, which receiving needs to stay well above.
+	"""
+	chip = sim.SimChip()
+	spi = control.SerialSPI(sim.SimSerial(chip, baudrate, latency))
+	c = control.CC2500Control(spi, config.CC2500Config(conf.reg_values, conf.fxosc))
+	results = {'link/air': (baudrate / 10) / (conf.param.drate / 8)}
+
+	with timer('control initialize'):
+		start = time.perf_counter()
+		c.initialize()
+		results['initialize s'] = time.perf_counter() - start
+		results['initialize round trips'] = spi.round_trips
+
+	frames = [sim_frame(conf, payload) for payload in payloads]
+	# As given to tx(), which adds the length byte
+	packets = [frame[1:] if conf.field.LENGTH_CONFIG == 1 else frame for frame in frames]
+	tx_packets = [packet for packet in packets if len(packet) < control.FIFO_SIZE]
+	with timer('control tx'):
+		round_trips = spi.round_trips
+		start = time.perf_counter()
+		for packet in tx_packets:
+			c.tx(packet)
+		wall = time.perf_counter() - start
+	results['tx packets/s'] = len(tx_packets) / wall
+	results['tx round trips/packet'] = (spi.round_trips - round_trips) / len(tx_packets)
+	results['tx sent'] = len(chip.sent) / len(tx_packets)
+
+	with timer('control tx_stream'):
+		chip.sent.clear()
+		round_trips = spi.round_trips
+		stream = c.tx_stream(packets)
+	found = collections.Counter(frames) & collections.Counter(frame for start, frame in chip.sent)
+	results['tx_stream packets/s'] = stream['packets/s']
+	results['tx_stream bytes/s'] = stream['bytes/s']
+	results['tx_stream round trips/packet'] = (spi.round_trips - round_trips) / len(packets)
+	results['tx_stream sent'] = sum(found.values()) / len(frames)
+
+	with timer('control rx_many'):
+		round_trips = spi.round_trips
+		start = time.perf_counter()
+		for i, frame in enumerate(frames):
+			chip.inject(frame, gap * (i + 1))
+		received = list(c.rx_many(len(frames), time.time() + gap * len(frames) + 1))
+		wall = time.perf_counter() - start
+	found = collections.Counter(frames) & collections.Counter(received)
+	results['rx packets/s'] = len(received) / wall
+	results['rx round trips/packet'] = (spi.round_trips - round_trips) / max(len(received), 1)
+	results['rx yield'] = sum(found.values()) / len(frames)
+
+	return results
+
+def bench_tx_stream(conf, payloads, timer, baudrate=2000000, latency=0.001):
+	"""tx_stream() of payloads longer than the TX FIFO, against a simulated chip and serial bridge
+
+	Long packets need refills faster than the FIFO drains, so the link
+	should be well faster than the air rate. air use is the air time of
+	the payloads sent relative to the time taken.
+	"""
+	chip = sim.SimChip()
+	spi = control.SerialSPI(sim.SimSerial(chip, baudrate, latency))
+	c = control.CC2500Control(spi, config.CC2500Config(conf.reg_values, conf.fxosc))
+	c.initialize()
+
+	# Packets too long for the length byte are sent in infinite length mode, without it
+	addr = bytes([conf.field.DEVICE_ADDR]) if conf.field.ADR_CHK else b''
+	packets = [addr + payload for payload in payloads]
+	frames = [bytes([len(packet)]) + packet if len(packet) <= control.MAX_VARIABLE_LENGTH else packet for packet in packets]
+	with timer('control tx_stream long'):
+		round_trips = spi.round_trips
+		stream = c.tx_stream(packets)
+	found = collections.Counter(frames) & collections.Counter(frame for start, frame in chip.sent)
+	stats = c.op_stats['tx_stream']
+	return {
+		'packets/s': stream['packets/s'],
+		'bytes/s': stream['bytes/s'],
+		'air use': stream['bytes/s'] * 8 / conf.param.drate,
+		'round trips/packet': (spi.round_trips - round_trips) / len(packets),
+		'underflows': stats['underflows'],
+		'sent': sum(found.values()) / len(frames),
+	}
+
+def format_results(name, results):
+	return '%s: %s' % (name, ', '.join('%s=%.4g' % item for item in results.items()))
+
+if __name__ == '__main__':
+	from optparse import OptionParser
+
+	parser = OptionParser(usage = 'usage: %prog [options] [CC2500-config]')
+
+	parser.add_option('-n', '--packets', dest='packets', type='int', help='Number of packets to generate')
+	parser.add_option('-m', '--max-size', dest='max_size', type='int', help='Maximum payload size')
+	parser.add_option('-s', '--sps', dest='sps', type='int', help='Samples per symbol')
+	parser.add_option('-N', '--noise', dest='noise', type='float', help='Noise standard deviation (full scale is 32768)')
+	parser.add_option('-d', '--dc', dest='dc', type='float', help='DC offset')
+	parser.add_option('-D', '--drift', dest='drift', type='float', help='Relative symbol clock error')
+	parser.add_option('-e', '--engine', dest='engines', action='append', choices=sorted(sdr.engines), help='Detection engine to benchmark (repeatable)')
+	parser.add_option('-S', '--seed', dest='seed', type='int', help='Random seed')
+	parser.add_option('-B', '--baudrate', dest='baudrate', type='int', help='Baud rate of the simulated serial link')
+	parser.add_option('-L', '--latency', dest='latency', type='float', help='Round trip latency of the simulated serial link, in seconds')
+	parser.add_option('-g', '--gap', dest='gap', type='float', help='Time between the packets received from the simulated chip, in seconds')
+
+	parser.set_defaults(packets=200, max_size=64, sps=4, noise=1000, dc=0, drift=0, seed=0, baudrate=2000000, latency=0.001, gap=0.02)
+
+	opts, args = parser.parse_args()
+
+	if not args:
+		conf = config.CC2500Config()
+	else:
+		conf = config.CC2500Config.fromhex(*args)
+
+	rng = np.random.default_rng(opts.seed)
+	payloads = gen.random_payloads(conf, opts.packets, rng, opts.max_size)
+	timer = Timer()
+
+	results = bench_parse_stream(conf, payloads, timer, opts.sps, opts.noise, opts.dc, opts.drift, engines=opts.engines, seed=opts.seed)
+	for engine, result in results.items():
+		print(format_results('parse_stream[%s]' % engine, result))
+
+	# The same with FEC, to see that decoding keeps up with the sample rate
+	fec_conf = config.CC2500Config(conf.reg_values, conf.fxosc)
+	fec_conf.field.FEC_EN = 1
+	fec_conf.field.MANCHESTER_EN = 0
+	fec_payloads = gen.random_payloads(fec_conf, opts.packets, rng, opts.max_size)
+	results = bench_parse_stream(fec_conf, fec_payloads, timer, opts.sps, opts.noise, opts.dc, opts.drift, engines=opts.engines, seed=opts.seed, name='parse_stream fec')
+	for engine, result in results.items():
+		print(format_results('parse_stream fec[%s]' % engine, result))
+
+	print(format_results('make_parser', bench_parser(conf, payloads, timer)))
+	print(format_results('make_parser fec', bench_parser(fec_conf, fec_payloads, timer, name='make_parser fec')))
+	if not conf.field.FEC_EN and not conf.field.MANCHESTER_EN:
+		print(format_results('make_batch_parser', bench_batch_parser(conf, payloads, rng, timer)))
+	print(format_results('fec_decode', bench_fec(rng, timer)))
+	results = bench_import()
+	print(format_results('import', results))
+	regressions = [name for name, value in results.items() if name.endswith((' numpy', ' slow')) and value]
+	if not results['tables ok']:
+		regressions.append('tables stale')
+	if regressions:
+		print('import regressions: %s' % ', '.join(regressions))
+	print(format_results('control', bench_control(conf, payloads[:50], timer, opts.baudrate, opts.latency, opts.gap)))
+
+	# Packets longer than the TX FIFO
+	long_conf = config.CC2500Config(conf.reg_values, conf.fxosc)
+	long_conf.field.LENGTH_CONFIG = 1
+	long_payloads = [rng.integers(0, 256, size, dtype=np.uint8).tobytes() for size in rng.integers(100, 601, 20)]
+	print(format_results('control long', bench_tx_stream(long_conf, long_payloads, timer, opts.baudrate, opts.latency)))
+
+	print()
+	print('Stage timing:')
+	print(timer.format())
@@ -0,0 +1,126 @@
+import binascii
+import struct
+import json
+import mmap
+
+from . import config
+from . import sdr
+
+# Capture file format: MAGIC, the length of the header as a little-endian
+# uint32 and the header itself as JSON. The header holds the FM and SDR
+# configuration, the sample format and the CC2500 registers. The raw samples
+# follow, starting at a multiple of ALIGN.
+MAGIC = b'CC2500\x00\x01'
+ALIGN = 16
+
+class TeeFile:
+	"""File-like object that writes everything read from f to out"""
+	def __init__(self, f, out):
+		self.f = f
+		self.out = out
+
+	def read(self, size=-1):
+		data = self.f.read(size)
+		self.out.write(data)
+		return data
+
+	def read1(self, size=-1):
+		data = self.f.read1(size)
+		self.out.write(data)
+		return data
+
+	def readinto(self, buf):
+		n = self.f.readinto(buf)
+		self.out.write(memoryview(buf).cast('B')[:n])
+		return n
+
+	def close(self):
+		self.out.close()
+
+class MappedFile:
+	"""Read-only file-like object over a buffer, eg. an mmap"""
+	def __init__(self, buf, pos=0):
+		self.buf = memoryview(buf)
+		self.pos = pos
+
+	def read(self, size=-1):
+		end = len(self.buf) if size < 0 else min(self.pos + size, len(self.buf))
+		data = bytes(self.buf[self.pos:end])
+		self.pos = end
+		return data
+
+	read1 = read
+
+	def readinto(self, buf):
+		view = memoryview(buf).cast('B')
+		n = min(len(view), len(self.buf) - self.pos)
+		view[:n] = self.buf[self.pos:self.pos+n]
+		self.pos += n
+		return n
+
+	def close(self):
+		self.buf.release()
+
+def write_header(out, conf, sdr_conf, fm, samples):
+	header = {
+		'fm': {'freq': fm.freq, 'samplerate': fm.samplerate, 'resamplerate': fm.resamplerate},
+		'sdr': {'ppm': sdr_conf.ppm, 'lo': sdr_conf.lo, 'gain': sdr_conf.gain},
+		'samples': {'size': samples.size, 'byteorder': samples.byteorder, 'signed': samples.signed},
+		'cc2500': {'fxosc': conf.fxosc, 'regs': binascii.hexlify(bytes(conf.reg_values)).decode('ascii')},
+	}
+	header = json.dumps(header).encode('utf-8')
+
+	size = len(MAGIC) + 4 + len(header)
+	header += b' ' * (-size % ALIGN)
+	out.write(MAGIC + struct.pack('<I', len(header)) + header)
+
+def read_header(buf):
+	"""Parse the header at the start of buf; returns (header, offset of samples)"""
+	assert buf[:len(MAGIC)] == MAGIC, 'Not a capture file'
+	size, = struct.unpack_from('<I', buf, len(MAGIC))
+	start = len(MAGIC) + 4
+	header = json.loads(bytes(buf[start:start+size]).decode('utf-8'))
+	return header, start + size
+
+def record(path, samples, conf, sdr_conf, fm):
+	"""Start recording samples to path
+
+	Returns RawSamples reading through to the original samples, writing
+	everything read to the capture file. Close the capture with
+	samples.f.close().
+	"""
+	out = open(path, 'wb')
+	write_header(out, conf, sdr_conf, fm, samples)
+	return sdr.RawSamples(TeeFile(samples.f, out), samples.size, samples.byteorder, samples.signed)
+
+class Capture:
+	"""Memory-mapped capture file
+
+	The samples attribute can be given directly to sdr.parse_stream(), along
+	with the conf, sdr and fm attributes holding the recorded configuration.
+	"""
+	def __init__(self, path):
+		with open(path, 'rb') as f:
+			self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+		header, self.offset = read_header(self.map)
+		self.header = header
+		self.conf = config.CC2500Config(binascii.unhexlify(header['cc2500']['regs']), header['cc2500']['fxosc'])
+		self.sdr = sdr.SDRConfig(**header['sdr'])
+		self.fm = sdr.FMConfig(**header['fm'])
+
+		fmt = header['samples']
+		self.samples = sdr.RawSamples(MappedFile(self.map, self.offset), fmt['size'], fmt['byteorder'], fmt['signed'])
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+	def rewind(self):
+		self.samples.f.pos = self.offset
+
+	def close(self):
+		self.samples.f.close()
+		self.map.close()
@@ -1,4 +1,9 @@
 import binascii
+import bisect
+
+from .lazy import LazyModule
+
+np = LazyModule('numpy')
 
 reg_data = """
 IOCFG2   7: 6:GDO2_INV 5-0:GDO2_CFG
@@ -118,56 +123,87 @@ def parse_reg_defs(reg_data):
 
 	return reg_defs, field_defs
 
-# Parse reg_data
-reg_defs, field_defs = parse_reg_defs(reg_data)
-reg2addr = {name: addr for addr, (name, fields) in enumerate(reg_defs)}
+# Compile field_defs into plans of (register address, mask, register shift, field shift)
+# per field part, so that a field value is sum(((values[addr] >> reg_shift) & mask) << field_shift)
+
+def compile_field(field_parts, reg2addr):
+	return tuple((reg2addr[reg_name], (1 << (reg_bits[0] - reg_bits[1] + 1)) - 1, reg_bits[1], field_bits[1]) for field_bits, reg_name, reg_bits in field_parts)
+
+# Tables derived from reg_data; cc2500/regtables.py holds a precomputed copy of them,
+# so the parsing and consistency checks don't need to run on every import
+
+TABLES = ('reg_defs', 'field_defs', 'reg2addr', 'field_plans', 'field_widths')
+
+def build_tables(reg_data):
+	reg_defs, field_defs = parse_reg_defs(reg_data)
+	reg2addr = {name: addr for addr, (name, fields) in enumerate(reg_defs)}
+	field_plans = {field_name: compile_field(fields, reg2addr) for field_name, fields in field_defs.items()}
+	field_widths = {field_name: max(field_bits[0] for field_bits, reg_name, reg_bits in fields) + 1 for field_name, fields in field_defs.items()}
+	return reg_defs, field_defs, reg2addr, field_plans, field_widths
+
+def reg_data_crc(reg_data):
+	return binascii.crc32(reg_data.encode('ascii'))
+
+def load_tables():
+	"""Tables from regtables if it's up to date with reg_data, else from build_tables()"""
+	try:
+		from . import regtables
+	except ImportError:
+		regtables = None
+
+	if regtables is None or regtables.reg_data_crc != reg_data_crc(reg_data):
+		return build_tables(reg_data)
+
+	return tuple(getattr(regtables, name) for name in TABLES)
+
+def gen_tables(path):
+	import pprint
+
+	with open(path, 'w') as f:
+		print('# Generated from config.reg_data by "python3 -m cc2500.config --gen-tables", do not edit', file=f)
+		print(file=f)
+		print('reg_data_crc = 0x%08x' % reg_data_crc(reg_data), file=f)
+		for name, table in zip(TABLES, build_tables(reg_data)):
+			print(file=f)
+			print('%s = %s' % (name, pprint.pformat(table, width=120, sort_dicts=False)), file=f)
+
+def check_tables():
+	"""Names of the tables that differ between regtables and build_tables()"""
+	try:
+		from . import regtables
+	except ImportError:
+		return list(TABLES)
+
+	if regtables.reg_data_crc != reg_data_crc(reg_data):
+		return list(TABLES)
+
+	return [name for name, table in zip(TABLES, build_tables(reg_data)) if getattr(regtables, name) != table]
+
+reg_defs, field_defs, reg2addr, field_plans, field_widths = load_tables()
 
 # Functions for extracting/spreading field/parameter values from/to register/field values
 
+def get_field(plan, values):
+	value = 0
+	for addr, mask, reg_shift, field_shift in plan:
+		value |= ((values[addr] >> reg_shift) & mask) << field_shift
+	return value
+
+def set_field(plan, values, value):
+	for addr, mask, reg_shift, field_shift in plan:
+		values[addr] = (values[addr] & ~(mask << reg_shift)) | (((value >> field_shift) & mask) << reg_shift)
+
 def extract_field(field_parts, values):
-	width = max(field_bits[0] for field_bits, reg_name, reg_bits in field_parts) + 1
-	ret = [None] * width
-	for field_bits, reg_name, reg_bits in field_parts:
-		reg_addr = reg2addr[reg_name]
-		value = values[reg_addr]
-		for bit in range(reg_bits[0] - reg_bits[1] + 1):
-			field_bit = field_bits[1] + bit
-			reg_bit = reg_bits[1] + bit
-			ret[field_bit] = str((value >> reg_bit) & 1)
-	return int(''.join(reversed(ret)), 2)
+	return get_field(compile_field(field_parts, reg2addr), values)
 
 def extract_fields(reg_values):
-	values = {}
-	for field_name, fields in field_defs.items():
-		value = extract_field(fields, reg_values)
-		values[field_name] = value
-	return values
+	return {field_name: get_field(plan, reg_values) for field_name, plan in field_plans.items()}
 
 def spread_field(field_parts, values, value):
-	for field_bits, reg_name, reg_bits in field_parts:
-		reg_addr = reg2addr[reg_name]
-		reg_value = values[reg_addr]
-		for bit in range(reg_bits[0] - reg_bits[1] + 1):
-			field_bit = field_bits[1] + bit
-			reg_bit = reg_bits[1] + bit
-			reg_value = (reg_value & ~(1 << reg_bit)) | (((value >> field_bit) & 1) << reg_bit)
-		values[reg_addr] = reg_value
+	set_field(compile_field(field_parts, reg2addr), values, value)
 
 def extract_float(vals, name):
-	m_width = max(field_bits[0] for field_bits, reg_name, reg_bits in field_defs[name + '_M']) + 1
-	return (2**m_width + vals[name + '_M']) * 2**vals[name + '_E']
-
-def spread_float(vals, name, val):
-	m_width = max(field_bits[0] for field_bits, reg_name, reg_bits in field_defs[name + '_M']) + 1
-	e_width = max(field_bits[0] for field_bits, reg_name, reg_bits in field_defs[name + '_E']) + 1
-
-	e = val.bit_length() - m_width - 1
-	m = val // 2**e - 2**m_width
-
-	assert 0 <= m < 2**m_width and 0 <= e < 2**e_width
-
-	vals[name + '_M'] = m
-	vals[name + '_E'] = e
+	return (2**field_widths[name + '_M'] + vals[name + '_M']) * 2**vals[name + '_E']
 
 def extract_freq_if(fxosc, vals):   return fxosc / 2**10 * vals['FREQ_IF']
 def extract_freqoff(fxosc, vals):   return fxosc / 2**14 * ((vals['FREQOFF'] & 0x7f) - (vals['FREQOFF'] & 0x80))
@@ -180,10 +216,10 @@ def extract_deviation(fxosc, vals): return fxosc / 2**17 * extract_float(vals, '
 def spread_freq_if(fxosc, vals, value):   vals['FREQ_IF'] = round(value * 2**10 / fxosc)
 def spread_freqoff(fxosc, vals, value):   vals['FREQOFF'] = round(value * 2**14 / fxosc) & 0xff
 def spread_freq(fxosc, vals, value):      vals['FREQ'] = round(value * 2**16 / fxosc)
-def spread_chanbw(fxosc, vals, value):    spread_float(vals, 'CHANBW', round(fxosc / (8 * value)))
-def spread_drate(fxosc, vals, value):     spread_float(vals, 'DRATE', round(value * 2**28 / fxosc))
-def spread_chanspc(fxosc, vals, value):   spread_float(vals, 'CHANSPC', round(value * 2**18 / fxosc))
-def spread_deviation(fxosc, vals, value): spread_float(vals, 'DEVIATION', round(value * 2**17 / fxosc))
+def spread_chanbw(fxosc, vals, value):    solve_param(fxosc, vals, 'chanbw', value)
+def spread_drate(fxosc, vals, value):     solve_param(fxosc, vals, 'drate', value)
+def spread_chanspc(fxosc, vals, value):   solve_param(fxosc, vals, 'chanspc', value)
+def spread_deviation(fxosc, vals, value): solve_param(fxosc, vals, 'deviation', value)
 
 param_funcs = {
 	'freq_if': (extract_freq_if, spread_freq_if),
@@ -198,6 +234,94 @@ param_funcs = {
 def extract_params(fxosc, vals):
 	return {name: extract(fxosc, vals) for name, (extract, spread) in param_funcs.items()}
 
+# Solvers for the parameters encoded as mantissa/exponent field pairs
+
+float_params = {'chanbw': 'CHANBW', 'drate': 'DRATE', 'chanspc': 'CHANSPC', 'deviation': 'DEVIATION'}
+
+class FloatSolver:
+	"""Finds the (M, E) field values giving the parameter value nearest to the requested one
+
+	All the achievable values for the given fxosc are tabulated (sorted) up
+	front, so solving is a bisection. Solutions are (m, e, value, error)
+	tuples, where m and e are the field values, value the parameter value
+	they give and error the difference of that to the requested value.
+	solve_many() solves many values at once with NumPy, returning a tuple
+	of arrays.
+	"""
+	def __init__(self, param, fxosc):
+		self.param = param
+		self.fxosc = fxosc
+
+		field = float_params[param]
+		extract = param_funcs[param][0]
+		table = sorted(
+			(extract(fxosc, {field + '_M': m, field + '_E': e}), m, e)
+			for m in range(2**field_widths[field + '_M'])
+			for e in range(2**field_widths[field + '_E'])
+		)
+		self.values = [value for value, m, e in table]
+		self.ms = [m for value, m, e in table]
+		self.es = [e for value, m, e in table]
+
+	def index(self, value):
+		i = bisect.bisect_left(self.values, value, 1, len(self.values) - 1)
+		return i - (value - self.values[i-1] < self.values[i] - value)
+
+	def solve(self, value):
+		i = self.index(value)
+		return self.ms[i], self.es[i], self.values[i], self.values[i] - value
+
+	def solve_many(self, values):
+		values = np.asarray(values, dtype=float)
+		table = np.array(self.values)
+		i = np.searchsorted(table, values).clip(1, len(table) - 1)
+		i -= values - table[i-1] < table[i] - values
+		achieved = table[i]
+		return np.array(self.ms)[i], np.array(self.es)[i], achieved, achieved - values
+
+	def in_range(self, value):
+		"""Whether value is at most half a step beyond the achievable values"""
+		values = self.values
+		return values[0] - (values[1] - values[0]) / 2 <= value <= values[-1] + (values[-1] - values[-2]) / 2
+
+solvers = {}
+
+def get_solver(param, fxosc):
+	solver = solvers.get((param, fxosc))
+	if solver is None:
+		solver = solvers[param, fxosc] = FloatSolver(param, fxosc)
+	return solver
+
+def solve_param(fxosc, vals, param, value):
+	solver = get_solver(param, fxosc)
+	assert solver.in_range(value), '%s %r out of range' % (param, value)
+
+	m, e, achieved, error = solver.solve(value)
+	field = float_params[param]
+	vals[field + '_M'] = m
+	vals[field + '_E'] = e
+
+# Batch decoding of many register dumps with NumPy
+
+def config_array(reg_dumps):
+	"""2-D uint8 array of a sequence of register dumps, one dump per row"""
+	if isinstance(reg_dumps, np.ndarray):
+		return reg_dumps.astype(np.uint8, copy=False).reshape(-1, len(reg_defs))
+	return np.frombuffer(b''.join(map(bytes, reg_dumps)), dtype=np.uint8).reshape(-1, len(reg_defs))
+
+def extract_fields_array(reg_dumps):
+	"""Like extract_fields(), but for many register dumps; values are int64 columns"""
+	regs = config_array(reg_dumps).T.astype(np.int64)
+	return extract_fields(regs)
+
+def decode_configs(reg_dumps, fxosc=26e6):
+	"""Fields and params of many register dumps, as dicts of NumPy columns
+
+	fxosc is either a single frequency or one per dump.
+	"""
+	fields = extract_fields_array(reg_dumps)
+	return fields, extract_params(fxosc, fields)
+
 # Functions for formatting things for output
 
 def format_bitrange(bits):
@@ -278,12 +402,37 @@ class CC2500Config:
 		self.reg = RegAccess(self)
 		self.field = FieldAccess(self)
 		self.param = ParameterAccess(self)
+		# Bitmap of the registers changed since clear_dirty(), ie. not yet written to the chip
+		self.dirty = (1 << len(self.reg_values)) - 1
 
 	def __getitem__(self, key):
 		return self.reg_values[key]
 
 	def __setitem__(self, key, value):
-		self.reg_values[key] = value
+		key = range(len(self.reg_values))[key]
+		if self.reg_values[key] != value:
+			self.reg_values[key] = value
+			self.dirty |= 1 << key
+
+	def dirty_regs(self):
+		return [addr for addr in range(len(self.reg_values)) if (self.dirty >> addr) & 1]
+
+	def dirty_runs(self, gap=0):
+		"""Runs of dirty registers as (address, values) pairs
+
+		Runs separated by at most gap clean registers are merged, the clean
+		registers being included with their current values.
+		"""
+		runs = []
+		for addr in self.dirty_regs():
+			if runs and addr - runs[-1][1] <= gap + 1:
+				runs[-1][1] = addr
+			else:
+				runs.append([addr, addr])
+		return [(start, bytes(self.reg_values[start:end+1])) for start, end in runs]
+
+	def clear_dirty(self):
+		self.dirty = 0
 
 	@classmethod
 	def fromhex(cls, hexstr, fxosc=26e6):
@@ -309,10 +458,10 @@ class RegAccess(Access):
 
 class FieldAccess(Access):
 	def __getitem__(self, key):
-		return extract_field(field_defs[key], self.config)
+		return get_field(field_plans[key], self.config)
 
 	def __setitem__(self, key, value):
-		spread_field(field_defs[key], self.config, value)
+		set_field(field_plans[key], self.config, value)
 
 class ParameterAccess(Access):
 	def __getitem__(self, key):
@@ -323,6 +472,19 @@ class ParameterAccess(Access):
 
 if __name__ == '__main__':
 	import sys
+	import os
+
+	if sys.argv[1:] == ['--gen-tables']:
+		gen_tables(os.path.join(os.path.dirname(__file__), 'regtables.py'))
+		sys.exit()
+
+	if sys.argv[1:] == ['--check-tables']:
+		stale = check_tables()
+		if stale:
+			print('regtables.py is out of date (%s), regenerate with --gen-tables' % ', '.join(stale))
+			sys.exit(1)
+		print('regtables.py is up to date')
+		sys.exit()
 
 	def handle_arg(arg):
 		if arg in {'default', 'dfl'}:
@@ -1,103 +1,867 @@
+import collections
+import contextlib
+import functools
+import itertools
+import threading
 import binascii
-import serial
+import queue
 import time
 
+from . import config
+
+# Command strobes
+SRES, SCAL, SRX, STX, SIDLE, SFRX, SFTX = b'\x30', b'\x33', b'\x34', b'\x35', b'\x36', b'\x3A', b'\x3B'
+# Status register reads, with a dummy byte to clock out the value
+MARCSTATE, TXBYTES, RXBYTES = b'\xF5\x00', b'\xFA\x00', b'\xFB\x00'
+
+# Changing these requires recalibrating the frequency synthesizer
+CALIBRATION_REGS = ('FSCTRL1', 'FSCTRL0', 'FREQ2', 'FREQ1', 'FREQ0', 'CHANNR', 'MDMCFG1', 'MDMCFG0')
+CALIBRATION_MASK = sum(1 << config.reg2addr[name] for name in CALIBRATION_REGS)
+
+# Clean registers between dirty ones that sync_config() rewrites to merge the bursts,
+# as each extra byte is cheaper than a separate transaction
+SYNC_GAP = 4
+
+# MARCSTATE value of the IDLE state
+STATE_IDLE = 0x01
+
+# RX/TX FIFO size, and the bytes of status appended to packets with APPEND_STATUS
+FIFO_SIZE = 64
+STATUS_SIZE = 2
+
+# Longest packet in variable length mode; longer ones are sent in infinite length mode
+MAX_VARIABLE_LENGTH = 255
+
+# Preamble bytes by NUM_PREAMBLE
+PREAMBLE_BYTES = [2, 3, 4, 6, 8, 12, 16, 24]
+
+# Bounds of the rx_stream() poll interval; the upper one keeps it responsive to end_time
+MIN_POLL_INTERVAL = 0.0
+MAX_POLL_INTERVAL = 0.1
+
+# Offset of RSSI readings in dB, from the datasheet
+RSSI_OFFSET = 72
+
+# Packets the Receiver queue holds before it starts dropping them
+QUEUE_SIZE = 256
+
+# Received packet; time is the host time at which it was read from the chip, and
+# rssi (in dBm) and lqi are from the status bytes appended to the packet
+Packet = collections.namedtuple('Packet', 'time data rssi lqi')
+
+def rssi_dbm(value):
+	"""RSSI status byte (two's complement, in half dB steps) in dBm"""
+	return (value - 256 if value >= 128 else value) / 2 - RSSI_OFFSET
+
+# Transfers up to this size have their hex encoding cached by SerialSPI
+HEX_CACHE_SIZE = 4
+
+class Transfer:
+	"""Queued SerialSPI transfer; rx is set once the queue has been flushed"""
+	__slots__ = ('data', 'line', 'log', 'rx')
+
+	def __init__(self, data, line, log):
+		self.data = data
+		self.line = line
+		self.log = log
+		self.rx = None
+
 class SerialSPI:
+	"""SPI bridge speaking lines of hex over a serial port
+
+	The bridge echoes each transfer back as "< hex" and answers with the bytes
+	read as "> hex". Transfers put in the queue with queue() are sent in a
+	single write by the next flush() (or xfer()), and the responses are
+	matched to them afterwards, so the batch costs one round trip.
+	"""
 	def __init__(self, ser):
 		self.ser = ser
+		self.pending = []
+		self.lines = {data: binascii.hexlify(data) for data in [SRES, SCAL, SRX, STX, SIDLE, SFRX, SFTX, MARCSTATE, TXBYTES, RXBYTES]}
 
-	def xfer(self, data, log=True):
-		data = binascii.hexlify(data)
-		size = len(data) + 4
+		self.round_trips = 0
+		self.tx_bytes = 0
+		self.rx_bytes = 0
+
+		# Time a byte takes on the serial line (start, 8 data and stop bits), and the last write took
+		baudrate = getattr(ser, 'baudrate', None)
+		self.byte_time = 10 / baudrate if baudrate else 0.0
+		self.write_time = 0.0
+
+		# Imported here rather than with the module, as only the link logs
+		import logging
+		self.logger = logging.getLogger(__name__)
+		self.log_level = logging.DEBUG
+
+	def encode(self, data):
+		line = self.lines.get(data)
+		if line is None:
+			line = binascii.hexlify(data)
+			if len(data) <= HEX_CACHE_SIZE:
+				self.lines[bytes(data)] = line
+		return line
+
+	def queue(self, data, log=True):
+		transfer = Transfer(data, self.encode(data), log)
+		self.pending.append(transfer)
+		return transfer
 
-		self.ser.write(data + b'\r')
+	def flush(self):
+		pending, self.pending = self.pending, []
+		if not pending:
+			return
 
-		tx = self.ser.read(size)
-		if log:
-			print(tx)
+		data = b''.join(transfer.line + b'\r' for transfer in pending)
+		self.ser.write(data)
+		resp = self.ser.read(sum(2 * (len(transfer.line) + 4) for transfer in pending))
 
-		assert tx.lower() == b'< ' + data + b'\r\n'
+		self.round_trips += 1
+		self.tx_bytes += len(data)
+		self.rx_bytes += len(resp)
+		self.write_time = len(data) * self.byte_time
 
-		rx = self.ser.read(size)
-		if log:
-			print(rx)
+		debug = self.logger.isEnabledFor(self.log_level)
+		pos = 0
+		for transfer in pending:
+			size = len(transfer.line) + 4
+			tx, rx = resp[pos:pos+size], resp[pos+size:pos+2*size]
+			pos += 2 * size
 
-		assert len(rx) == size
-		assert rx[:2] == b'> '
-		assert rx[-2:] == b'\r\n'
+			if debug and transfer.log:
+				self.logger.debug('%s %s', tx.rstrip().decode('ascii', 'replace'), rx.rstrip().decode('ascii', 'replace'))
 
-		return binascii.unhexlify(rx[2:-2])
+			assert tx.lower() == b'< ' + transfer.line + b'\r\n', 'Bad echo %r for %r' % (tx, transfer.line)
+			assert len(rx) == size and rx[:2] == b'> ' and rx[-2:] == b'\r\n', 'Bad response %r' % rx
+
+			transfer.rx = binascii.unhexlify(rx[2:-2])
+
+	def xfer(self, data, log=True):
+		transfer = self.queue(data, log)
+		self.flush()
+		return transfer.rx
+
+def counted(func):
+	"""Accumulate the calls, round trips and serial bytes of a CC2500Control operation in op_stats"""
+	@functools.wraps(func)
+	def wrapper(self, *args, **kwargs):
+		with self.count_op(func.__name__):
+			return func(self, *args, **kwargs)
+	return wrapper
 
 class CC2500Control:
 	def __init__(self, spi, conf=None):
 		self.spi = spi
 		self.conf = conf
+		# Register values last written to the chip, if known
+		self.regs = None
+		# PKTCTRL1 bits initialize() sets on top of conf
+		self.pktctrl1_bits = 0
+		# Operation name -> Counter of calls, round_trips, tx_bytes and rx_bytes
+		self.op_stats = collections.defaultdict(collections.Counter)
 
 	def xfer(self, data, log=True):
 		return self.spi.xfer(data, log=log)
 
-	def initialize(self):
+	def queue(self, data, log=True):
+		return self.spi.queue(data, log=log)
+
+	def flush(self):
+		self.spi.flush()
+
+	@contextlib.contextmanager
+	def count_op(self, name):
+		"""Count the serial traffic of the block as operation name; yields a Counter for extra counts"""
+		spi = self.spi
+		start = spi.round_trips, spi.tx_bytes, spi.rx_bytes
+		stats = collections.Counter(calls=1)
+		try:
+			yield stats
+		finally:
+			stats['round_trips'] += spi.round_trips - start[0]
+			stats['tx_bytes'] += spi.tx_bytes - start[1]
+			stats['rx_bytes'] += spi.rx_bytes - start[2]
+			self.op_stats[name] += stats
+
+	def format_op_stats(self):
+		lines = []
+		for name, stats in sorted(self.op_stats.items()):
+			line = '%-12s calls=%d round_trips=%d (%.1f/call) tx_bytes=%d rx_bytes=%d' % (
+				name, stats['calls'], stats['round_trips'], stats['round_trips'] / stats['calls'], stats['tx_bytes'], stats['rx_bytes'])
+			if stats['packets']:
+				line += ' packets=%d (%.2f round trips/packet)' % (stats['packets'], stats['round_trips'] / stats['packets'])
+			extra = sorted(set(stats) - {'calls', 'round_trips', 'tx_bytes', 'rx_bytes', 'packets'})
+			lines.append(' '.join([line] + ['%s=%d' % (key, stats[key]) for key in extra]))
+		return '\n'.join(lines)
+
+	def read_regs(self, *addrs):
+		"""Current values of the registers at addrs, in one round trip"""
+		transfers = [self.queue(bytes([0x80 | addr, 0]), log=False) for addr in addrs]
+		self.flush()
+		return [transfer.rx[1] for transfer in transfers]
+
+	@counted
+	def initialize(self, append_status=False):
 		# Reset chip
-		self.xfer(b'\x30')
+		self.xfer(SRES)
 		time.sleep(0.1)
 
 		# Write configuration
 		if self.conf:
-			self.xfer(b'\x40' + bytes(self.conf.reg_values))
+			self.queue(b'\x40' + bytes(self.conf.reg_values))
+			self.conf.clear_dirty()
+			self.regs = list(self.conf.reg_values)
 
-		# CRC_AUTOFLUSH=1, APPEND_STATUS=0
-		self.xfer(b'\x07\x08')
+		# CRC_AUTOFLUSH=1, APPEND_STATUS=append_status
+		pktctrl1 = 0x0c if append_status else 0x08
+		self.pktctrl1_bits = pktctrl1
+		self.queue(bytes([0x07, pktctrl1]))
+		if self.regs:
+			self.regs[0x07] = pktctrl1
 
 		# Calibrate frequency synthesizer
-		self.xfer(b'\x33')
-		time.sleep(0.1)
+		self.calibrate()
+
+	@counted
+	def calibrate(self, timeout=1.0):
+		# SCAL, along with anything queued
+		self.queue(SCAL)
+
+		# MARCSTATE; back in IDLE once calibrated
+		end_time = time.time() + timeout
+		while self.xfer(MARCSTATE, log=False)[1] & 0x1f != STATE_IDLE:
+			assert time.time() < end_time, 'Calibration timed out'
+
+	@counted
+	def sync_config(self):
+		"""Write the registers of conf changed since initialize() or the last sync_config()
+
+		Contiguous runs of changed registers are written in bursts, and the
+		frequency synthesizer is recalibrated only if frequency related
+		registers changed. CRC_AUTOFLUSH and APPEND_STATUS stay as
+		initialize() set them. Leaves the chip in IDLE. Returns whether
+		anything was written. All of it takes a single round trip, plus any
+		further MARCSTATE polls while calibrating.
+		"""
+		runs = self.conf.dirty_runs(SYNC_GAP)
+		if not runs:
+			return False
 
+		dirty = self.conf.dirty
+		recalibrate = dirty & CALIBRATION_MASK
+		if self.regs is None:
+			self.regs = list(self.conf.reg_values)
+
+		# SIDLE, along with the first write
+		prefix = SIDLE
+		for addr, values in runs:
+			# Rewrite the clean registers merged into the run with what the chip already has
+			values = bytearray(value if (dirty >> (addr + i)) & 1 else self.regs[addr + i] for i, value in enumerate(values))
+			# Keep CRC_AUTOFLUSH and APPEND_STATUS as initialize() set them
+			if addr <= 0x07 < addr + len(values):
+				values[0x07 - addr] |= self.pktctrl1_bits
+			values = bytes(values)
+			header = addr if len(values) == 1 else 0x40 | addr
+			self.queue(prefix + bytes([header]) + values)
+			self.regs[addr:addr+len(values)] = values
+			prefix = b''
+		self.conf.clear_dirty()
+
+		if recalibrate:
+			self.calibrate()
+		else:
+			self.flush()
+
+		return True
+
+	@counted
 	def tx(self, data):
 		# SIDLE; SFTX; WFIFO
-		self.xfer(b'\x36\x3B\x7F' + bytes([len(data)]) + data)
+		self.queue(SIDLE + SFTX + b'\x7F' + bytes([len(data)]) + data)
 		# STX
-		self.xfer(b'\x35')
+		self.queue(STX)
 
 		# RTXBYTES
-		tmp = self.xfer(b'\xFA\x00')
+		tmp = self.xfer(TXBYTES)
 		while tmp[0] & 0x70 == 0x20:
-			tmp = self.xfer(b'\xFA\x00', log=False)
+			tmp = self.xfer(TXBYTES, log=False)
 
 		return tmp
 
+	@counted
 	def rx_once(self, end_time=None):
 		# SIDLE; SFRX; SRX
-		self.xfer(b'\x36\x3A\x34')
+		self.queue(SIDLE + SFRX + SRX)
 
 		# RRXBYTES
-		tmp = self.xfer(b'\xFB\x00')
+		tmp = self.xfer(RXBYTES)
 		while tmp[0] & 0x70 == 0x10 and (end_time is None or time.time() < end_time):
-			tmp = self.xfer(b'\xFB\x00', log=False)
+			tmp = self.xfer(RXBYTES, log=False)
 
 		if tmp[0] & 0x70 != 0x10 and 0 < tmp[1] <= 64:
 			# RFIFO
 			return self.xfer(b'\xFF' + tmp[1] * b'\x00')[1:]
 
+	@counted
 	def rx(self, end_time=None, filter=None):
 		while (end_time is None or time.time() < end_time):
 			ret = self.rx_once(end_time)
 			if ret and (filter is None or filter(ret)):
 				return ret
 
+	def rx_stream(self, end_time=None):
+		"""Receive packets continuously until end_time, yielding them like rx_once() returns them"""
+		packets = self.rx_packets(end_time)
+		try:
+			for packet in packets:
+				yield packet.data
+		finally:
+			packets.close()
+
+	def rx_packets(self, end_time=None, stop=None):
+		"""Receive packets continuously until end_time or stop() returns true, yielding Packets
+
+		The radio is kept in RX between packets (MCSM1.RXOFF_MODE=3), and the
+		FIFO is drained incrementally, so packets longer than the FIFO work,
+		and the next packet can arrive while the previous one is read out.
+		Each poll is a single round trip that reads what was found available
+		by the previous one and RXBYTES (twice, as per the errata), leaving
+		one byte in the FIFO while a packet is still arriving. Poll
+		intervals follow from the data rate: the next poll is timed for when
+		the current packet should be complete, or the FIFO threshold reached.
+
+		CRC_AUTOFLUSH only works with a single packet in the FIFO, so the CRC
+		is checked from the appended status bytes instead (which also give
+		the RSSI and LQI of the packets). On RX FIFO
+		overflow the FIFO is flushed and reception restarted. PKTCTRL1 and
+		MCSM1 are restored and the radio put to IDLE when the generator
+		is closed.
+		"""
+		conf = self.conf or config.CC2500Config()
+		variable = conf.field.LENGTH_CONFIG == 1
+		max_length = conf.field.PACKET_LENGTH
+		check_crc = conf.field.CRC_EN
+
+		# Time per byte in the FIFO; FEC and Manchester encoding halve the data rate
+		byte_time = 8 / conf.param.drate
+		if conf.field.FEC_EN or conf.field.MANCHESTER_EN:
+			byte_time *= 2
+		threshold = 4 * (conf.field.FIFO_THR + 1)
+
+		pktctrl1_addr, mcsm1_addr = config.reg2addr['PKTCTRL1'], config.reg2addr['MCSM1']
+		if self.regs:
+			pktctrl1, mcsm1 = self.regs[pktctrl1_addr], self.regs[mcsm1_addr]
+		else:
+			pktctrl1, mcsm1 = self.read_regs(pktctrl1_addr, mcsm1_addr)
+
+		with self.count_op('rx_packets') as stats:
+			# SIDLE; CRC_AUTOFLUSH=0, APPEND_STATUS=1; RXOFF_MODE=3; SFRX; SRX
+			self.queue(SIDLE + bytes([pktctrl1_addr, (pktctrl1 & ~0x08) | 0x04, mcsm1_addr, mcsm1 | 0x0c]))
+			self.queue(SFRX + SRX)
+
+			buf = bytearray()
+			size = None
+			count = 0
+			next_poll = time.time()
+			latency = 0
+			try:
+				while (end_time is None or time.time() < end_time) and not (stop and stop()):
+					delay = next_poll - time.time()
+					if delay > 0:
+						time.sleep(delay)
+
+					# RFIFO; RRXBYTES twice
+					fifo = self.queue(b'\xFF' + count * b'\x00', log=False) if count else None
+					first = self.queue(RXBYTES, log=False)
+					rxbytes = self.xfer(RXBYTES, log=False)[1]
+					now = time.time()
+					# Decaying peak of the time from the planned poll to its results, including sleep overshoot
+					latency = max(now - next_poll, latency * 0.9)
+					stats['polls'] += 1
+					if fifo:
+						buf += fifo.rx[1:]
+
+					# Split off complete packets
+					resync = False
+					while buf:
+						if size is None:
+							size = (1 + buf[0] if variable else max_length) + STATUS_SIZE
+							if variable and buf[0] > max_length:
+								resync = True
+								break
+						if len(buf) < size:
+							break
+
+						packet, status = bytes(buf[:size-STATUS_SIZE]), buf[size-STATUS_SIZE:size]
+						del buf[:size]
+						size = None
+
+						if check_crc and not status[1] & 0x80:
+							stats['crc_errors'] += 1
+							continue
+
+						stats['packets'] += 1
+						yield Packet(now, packet, rssi_dbm(status[0]), status[1] & 0x7f)
+
+					if resync or rxbytes & 0x80:
+						if resync:
+							# Lost sync with the FIFO contents, start over; SIDLE; SFRX; SRX
+							stats['resyncs'] += 1
+						else:
+							# RXFIFO_OVERFLOW; SIDLE; SFRX; SRX
+							stats['overflows'] += 1
+						self.queue(SIDLE + SFRX + SRX)
+						buf.clear()
+						size = None
+						count = 0
+						next_poll = time.time()
+						continue
+
+					if first.rx[1] != rxbytes:
+						# RXBYTES was changing, poll again right away
+						count = 0
+						next_poll = time.time()
+						continue
+
+					available = rxbytes & 0x7f
+					missing = None if size is None else size - len(buf)
+					if missing is not None and missing <= available:
+						# The rest of the current packet is in the FIFO
+						count = missing
+					else:
+						count = max(available - 1, 0)
+
+					# Bytes to let arrive before the next poll
+					if missing is None:
+						# Read what there is right away to learn the size of the next packet
+						wait = 0 if count else threshold
+					elif missing > available:
+						wait = min(missing - available, threshold)
+					else:
+						wait = 0
+					# Bytes read now only leave the FIFO with the next poll, which must happen before it overflows;
+					# RXBYTES may have been read up to latency ago, and the next read may take as long to land
+					wait = min(wait, FIFO_SIZE - available - 4 - 2 * latency / byte_time)
+					next_poll = time.time() + min(max(wait * byte_time, MIN_POLL_INTERVAL), MAX_POLL_INTERVAL)
+			finally:
+				# SIDLE; restore PKTCTRL1 and MCSM1; SFRX
+				self.queue(SIDLE + bytes([pktctrl1_addr, pktctrl1, mcsm1_addr, mcsm1]))
+				self.xfer(SFRX)
+
 	def rx_many(self, count=1, end_time=None, filter=None):
-		while count > 0 and (end_time is None or time.time() < end_time):
-			ret = self.rx_once(end_time)
-			if ret and (filter is None or filter(ret)):
-				count -= 1
-				yield ret
+		if count <= 0:
+			return
+
+		stream = self.rx_stream(end_time)
+		try:
+			for ret in stream:
+				if filter is None or filter(ret):
+					count -= 1
+					yield ret
+					if count <= 0:
+						break
+		finally:
+			stream.close()
+
+	def tx_stream(self, packets):
+		"""Send packets back to back, refilling the TX FIFO as it drains
+
+		The radio is kept in TX between packets (MCSM1.TXOFF_MODE=2), so each
+		packet follows the previous one without going through IDLE, and the
+		FIFO is topped up whenever it has drained to the TX threshold of
+		FIFOTHR (61 - 4 * FIFO_THR bytes), so packets can be longer than the
+		FIFO. packets can be any iterable, and is consumed as the FIFO has
+		room.
+
+		In variable length mode, packets too long for the length byte are
+		sent separately in infinite length mode, which is switched to fixed
+		length (PKTLEN being set to the length modulo 256) once the end of
+		the packet is in the FIFO. Infinite length mode in conf is handled
+		the same way for every packet.
+
+		On TX FIFO underflow the packets not completely sent are lost, and
+		sending resumes from the next one (counted in the underflows and
+		lost op_stats). PKTCTRL0, PKTLEN and MCSM1 are restored and the
+		radio put to IDLE at the end. Returns a dict of the packets and
+		payload bytes sent, the time taken and the resulting packets/s and
+		bytes/s.
+		"""
+		conf = self.conf or config.CC2500Config()
+		length_config = conf.field.LENGTH_CONFIG
+
+		byte_time = 8 / conf.param.drate
+		if conf.field.FEC_EN or conf.field.MANCHESTER_EN:
+			byte_time *= 2
+		threshold = 61 - 4 * conf.field.FIFO_THR
+		# Bytes of air time between the data of consecutive packets, at most
+		overhead = PREAMBLE_BYTES[conf.field.NUM_PREAMBLE] + 4 + 2 * conf.field.CRC_EN
+
+		pktctrl0_addr, pktlen_addr, mcsm1_addr = config.reg2addr['PKTCTRL0'], config.reg2addr['PKTLEN'], config.reg2addr['MCSM1']
+		if self.regs:
+			pktctrl0, pktlen, mcsm1 = self.regs[pktctrl0_addr], self.regs[pktlen_addr], self.regs[mcsm1_addr]
+		else:
+			pktctrl0, pktlen, mcsm1 = self.read_regs(pktctrl0_addr, pktlen_addr, mcsm1_addr)
+		restore = bytes([pktctrl0_addr, pktctrl0, pktlen_addr, pktlen, mcsm1_addr, mcsm1])
+
+		def infinite(packet):
+			return length_config == 2 or (length_config == 1 and len(packet) > MAX_VARIABLE_LENGTH)
+
+		def frames(packets, length_byte):
+			for packet in packets:
+				if length_config == 0:
+					assert len(packet) == pktlen, 'Packet length %d does not match PKTLEN %d' % (len(packet), pktlen)
+				yield (bytes([len(packet)]) + packet if length_byte else packet), len(packet)
+
+		with self.count_op('tx_stream') as stats:
+			# SIDLE; SFTX; TXOFF_MODE=2
+			self.queue(SIDLE + SFTX + bytes([mcsm1_addr, (mcsm1 & ~0x03) | 0x02]))
+			start = time.time()
+			try:
+				for long, group in itertools.groupby(packets, infinite):
+					if not long:
+						self.tx_fifo(frames(group, length_config == 1), byte_time, threshold, overhead, stats)
+						continue
+
+					for frame in frames(group, False):
+						# Infinite length, with PKTLEN for switching to fixed length at the end
+						self.queue(bytes([pktctrl0_addr, (pktctrl0 & ~0x03) | 0x02, pktlen_addr, frame[1] & 0xff]))
+						self.tx_fifo([frame], byte_time, threshold, overhead, stats, bytes([pktctrl0_addr, pktctrl0 & ~0x03]))
+						self.queue(bytes([pktctrl0_addr, pktctrl0]))
+			finally:
+				# SIDLE; restore PKTCTRL0, PKTLEN and MCSM1; SFTX
+				self.queue(SIDLE + restore)
+				self.xfer(SFTX)
+
+			seconds = time.time() - start
+			return {
+				'packets': stats['packets'],
+				'bytes': stats['bytes'],
+				'seconds': seconds,
+				'packets/s': stats['packets'] / seconds,
+				'bytes/s': stats['bytes'] / seconds,
+			}
+
+	def tx_fifo(self, frames, byte_time, threshold, overhead, stats, end=None):
+		"""Stream frames through the TX FIFO back to back, and wait for them to be sent
+
+		frames are (bytes, payload size) pairs; the ones sent are counted
+		in the packets and bytes of stats. Each round trip writes the whole
+		frames that fit in the FIFO, topped up with the start of a frame
+		longer than the FIFO if one is next, and then reads TXBYTES. Frames
+		fitting in the FIFO are never split between writes, as the chip
+		sends preamble while the FIFO is empty between packets, but
+		underflows if it runs empty in the middle of one.
+
+		TXBYTES reaches the chip once the write before it is all out, as
+		the next write will once its own bytes are, so the room for that
+		write is what was free when TXBYTES was read, plus what has surely
+		been sent from then until the write lands: the bytes the elapsed
+		time allows for, less overhead bytes (preamble, sync word and CRC)
+		at each packet boundary on the way. The next round trip is timed
+		for when the FIFO should have drained to threshold bytes (or enough
+		for the next frame), and while a long frame is being written, for
+		the write to reach the chip before the FIFO could have drained
+		below threshold bytes even at the full data rate and the slowest
+		recent round trip. end is queued along with the last bytes. Leaves
+		the chip in IDLE with an empty FIFO.
+		"""
+		frames = iter(frames)
+		buf = bytearray()
+		more = True
+		# Bytes taken from frames and written to the FIFO, and the (start, end, payload size) of the frames not yet sent
+		pulled = written = 0
+		pending = collections.deque()
+		free = FIFO_SIZE
+		started = False
+		latency = 0
+
+		def drained(position, level, elapsed):
+			"""Bytes surely sent in elapsed byte times, from position on with level bytes in the FIFO"""
+			count = 0
+			for start, stop, size in pending:
+				if stop <= position + count:
+					continue
+				if start >= position + count:
+					# The packet hasn't started, so there's a gap first
+					elapsed -= overhead
+				part = min(elapsed, stop - position - count)
+				if part <= 0:
+					break
+				count += part
+				elapsed -= part
+			return min(int(count), level)
+
+		while True:
+			# Up to one frame more than fits, so that the end of frames is known once it's all written
+			while more and len(buf) <= free:
+				try:
+					frame, size = next(frames)
+				except StopIteration:
+					more = False
+					break
+				pending.append((pulled, pulled + len(frame), size))
+				pulled += len(frame)
+				buf += frame
+
+			# Whole frames, then as much of a frame longer than the FIFO as fits
+			count = 0
+			for start, stop, size in pending:
+				if stop <= written:
+					continue
+				if stop - written <= free:
+					count = stop - written
+				elif stop - start > FIFO_SIZE:
+					count = free
+					break
+				else:
+					break
+
+			if count:
+				# WFIFO
+				chunk = bytes(buf[:count])
+				del buf[:count]
+				written += len(chunk)
+				self.queue(b'\x7F' + chunk)
+				if end and not more and not buf:
+					self.queue(end)
+				if not started:
+					# STX
+					self.queue(STX)
+					started = True
+				stats['refills'] += 1
+
+			# RTXBYTES
+			sent = time.time()
+			status, txbytes = self.xfer(TXBYTES, log=False)
+			now = time.time()
+			latency = max(now - sent, latency * 0.9)
+			# TXBYTES was read one way trip after the write was all out, like the next write will land
+			read = sent + self.spi.write_time
+
+			# Bytes in the FIFO, and out of it, when TXBYTES was read
+			level = txbytes & 0x7f
+			position = written - level
+
+			if txbytes & 0x80:
+				# TXFIFO_UNDERFLOW: the bytes still in the FIFO never went out, so only the frames that
+				# had drained completely were sent; resume from the first frame not written yet
+				stats['underflows'] += 1
+				while pending and pending[0][0] < written:
+					start, stop, size = pending.popleft()
+					if stop <= position:
+						stats['packets'] += 1
+						stats['bytes'] += size
+					else:
+						stats['lost'] += 1
+				resume = pending[0][0] if pending else pulled
+				del buf[:resume - written]
+				written = resume
+				free = FIFO_SIZE
+				started = False
+				# SIDLE; SFTX
+				self.queue(SIDLE + SFTX)
+				continue
+
+			# Frames out of the FIFO are taken as sent
+			while pending and pending[0][1] <= position:
+				start, stop, size = pending.popleft()
+				stats['packets'] += 1
+				stats['bytes'] += size
+
+			if not more and not buf and not level:
+				# Let the last byte and the CRC go out
+				time.sleep(3 * byte_time)
+				break
+
+			state = status & 0x70
+			if state in (0x00, 0x10, 0x30):
+				# Out of TX (IDLE, RX or FSTXON), so the FIFO won't drain
+				stats['stalls'] += 1
+				stats['lost'] += len(pending)
+				break
+			if state != 0x20:
+				# Calibrating or settling, nothing sent yet
+				free = FIFO_SIZE - level
+				time.sleep(overhead * byte_time)
+				continue
+
+			# The next frame to write, and whether it's partly written already
+			start, stop, size = next(((start, stop, size) for start, stop, size in pending if stop > written), (written, written, 0))
+			if not more and not buf:
+				wake = read + level * byte_time
+			elif start < written:
+				# TXBYTES could have been read as soon as it was sent, and the write take the slowest round trip to land
+				wake = sent + (level - threshold) * byte_time - latency
+			else:
+				target = min(threshold, max(FIFO_SIZE - (stop - start), 0))
+				gaps = sum(position <= start < position + level - target for start, stop, size in pending) * overhead
+				wake = read + (level - target + gaps) * byte_time
+			delay = wake - time.time()
+			time.sleep(min(max(delay, MIN_POLL_INTERVAL), MAX_POLL_INTERVAL))
+
+			# The write lands after its own bytes are out too, which takes longer the more there's room for
+			elapsed = (time.time() - read) / byte_time
+			free = FIFO_SIZE - level + drained(position, level, elapsed)
+			free = FIFO_SIZE - level + drained(position, level, elapsed + (free + 1) * self.spi.byte_time / byte_time)
+
+		# SIDLE; SFTX
+		self.queue(SIDLE + SFTX)
+
+class Receiver:
+	"""Background thread receiving continuously with a CC2500Control
+
+	The thread owns the control (and so the SPI link) while running:
+	received Packets are put in a bounded queue (counting the ones dropped
+	when it's full in dropped), and packets to send are submitted with
+	send(), which interrupts reception between polls to transmit them.
+	Iterating the receiver yields the packets until stop() is called.
+	The queue can also be given, to share it between receivers; each one
+	puts None in it when it stops.
+	"""
+	def __init__(self, control, queue_size=QUEUE_SIZE, packets=None):
+		self.control = control
+		self.packets = queue.Queue(queue_size) if packets is None else packets
+		self.tx_queue = queue.Queue()
+		self.dropped = 0
+		self.error = None
+		self.stopping = threading.Event()
+		self.thread = threading.Thread(target=self.run, daemon=True)
+
+	def start(self):
+		self.thread.start()
+		return self
+
+	def stop(self, timeout=None):
+		self.stopping.set()
+		self.thread.join(timeout)
+
+	def __enter__(self):
+		return self.start()
+
+	def __exit__(self, *exc):
+		self.stop()
+
+	def send(self, data):
+		"""Queue data for sending; returns a Future for the result of CC2500Control.tx()"""
+		# Imported here rather than with the module, as it's slow to import and only sending needs it
+		import concurrent.futures
+		future = concurrent.futures.Future()
+		self.tx_queue.put((data, future))
+		return future
+
+	def interrupted(self):
+		return self.stopping.is_set() or not self.tx_queue.empty()
+
+	def run(self):
+		try:
+			while not self.stopping.is_set():
+				for packet in self.control.rx_packets(stop=self.interrupted):
+					self.deliver(packet)
+
+				while True:
+					try:
+						data, future = self.tx_queue.get_nowait()
+					except queue.Empty:
+						break
+					if future.set_running_or_notify_cancel():
+						try:
+							future.set_result(self.control.tx(data))
+						except Exception as exc:
+							future.set_exception(exc)
+							raise
+		except Exception as exc:
+			self.error = exc
+		finally:
+			self.stopping.set()
+			# Fail the sends still queued, and wake up the consumer
+			while not self.tx_queue.empty():
+				data, future = self.tx_queue.get_nowait()
+				if future.set_running_or_notify_cancel():
+					future.set_exception(RuntimeError('Receiver stopped'))
+			# Make room for the end marker if the consumer has fallen behind
+			try:
+				self.packets.put_nowait(None)
+			except queue.Full:
+				self.packets.get_nowait()
+				self.dropped += 1
+				self.packets.put_nowait(None)
+
+	def deliver(self, packet):
+		try:
+			self.packets.put_nowait(packet)
+		except queue.Full:
+			self.dropped += 1
+
+	def get(self, timeout=None):
+		"""Next packet, or None once the receiver has stopped; raises queue.Empty on timeout"""
+		packet = self.packets.get(timeout=timeout)
+		if packet is None:
+			# Leave the end marker for other consumers
+			self.packets.put(None)
+		return packet
+
+	def __iter__(self):
+		while True:
+			packet = self.get()
+			if packet is None:
+				break
+			yield packet
+
+		if self.error is not None:
+			raise self.error
 
 if __name__ == '__main__':
-	c = CC2500Control(SerialSPI(serial.Serial('/dev/ttyUSB0', 115200, parity='N', stopbits=1, timeout=1)))
-	c.initialize()
+	import logging
+	from optparse import OptionParser
+
+	parser = OptionParser(usage = 'usage: %prog [options] [port...]')
+
+	parser.add_option('-b', '--baudrate', dest='baudrate', type='int', help='Serial port baud rate')
+	parser.add_option('-c', '--channel', dest='channels', type='int', action='append', help='Channel (CHANNR) to configure, one per port or one for all')
+	parser.add_option('-n', '--count', dest='count', type='int', help='Number of packets to receive')
+
+	parser.set_defaults(baudrate=115200, count=2)
+
+	opts, ports = parser.parse_args()
+	ports = ports or ['/dev/ttyUSB0']
+
+	confs = [None] * len(ports)
+	if opts.channels:
+		channels = opts.channels * len(ports) if len(opts.channels) == 1 else opts.channels
+		if len(channels) != len(ports):
+			parser.error('give one channel, or one per port')
+		confs = [config.CC2500Config() for port in ports]
+		for conf, channel in zip(confs, channels):
+			conf.field.CHAN = channel
+
+	logging.basicConfig(level=logging.DEBUG, format='%(message)s')
+
+	if len(ports) == 1:
+		import serial
+
+		c = CC2500Control(SerialSPI(serial.Serial(ports[0], opts.baudrate, parity='N', stopbits=1, timeout=1)), confs[0])
+		c.initialize()
+
+		for i in range(2):
+			c.tx(b'\xCA\xFE\xBA\xBE')
+
+		for ret in c.rx_many(opts.count):
+			print(ret)
+
+		print(c.format_op_stats())
+	else:
+		from . import multi
+
+		manager = multi.RadioManager.open(ports, confs, opts.baudrate)
+		manager.initialize()
 
-	for i in range(2):
-		c.tx(b'\xCA\xFE\xBA\xBE')
+		with manager:
+			for port in ports:
+				for i in range(2):
+					manager.send(port, b'\xCA\xFE\xBA\xBE').result()
 
-	for ret in c.rx_many(2):
-		print(ret)
+			for i, packet in enumerate(manager):
+				print(packet.radio, packet.data)
+				if i + 1 >= opts.count:
+					break
 
+		print(manager.format_op_stats())
@@ -0,0 +1,58 @@
+import io
+
+import numpy as np
+
+from . import parse
+from . import sdr
+
+def build_frame(conf, payload, addr=None):
+	"""Raw on-air bytes of a packet, as parse.make_parser() expects them"""
+	encode, encode_many = parse.make_encoder(conf)
+	return encode(payload, addr)
+
+def random_payloads(conf, count, rng, max_size=None):
+	"""Random payloads that fit the packet length settings of conf"""
+	addr_size = int(conf.field.ADR_CHK != 0)
+	size = conf.field.PACKET_LENGTH - addr_size
+	if max_size is not None:
+		size = min(size, max_size)
+
+	fixed = conf.field.LENGTH_CONFIG == 0
+	return [rng.integers(0, 256, size if fixed else rng.integers(min(size, 1), size + 1), dtype=np.uint8).tobytes() for i in range(count)]
+
+def render(frames, sps, amplitude=8000, noise=0, dc=0, drift=0, gap=64, seed=None):
+	"""FM-demodulated samples of the frames, as int16
+
+	sps is the number of samples per symbol, noise the standard deviation of
+	the added Gaussian noise and dc a constant offset. drift is the relative
+	symbol clock error of the transmitter, so eg. 1e-3 makes each symbol
+	0.1% longer than sps. Frames are separated (and the whole stream padded)
+	by gap bytes (8 * gap symbols) of no signal.
+	"""
+	rng = np.random.default_rng(seed)
+	pad = np.zeros(gap * 8, dtype=np.int8)
+
+	levels = [pad]
+	for frame in frames:
+		bits = np.unpackbits(np.frombuffer(frame, dtype=np.uint8)).astype(np.int8)
+		levels.extend([2 * bits - 1, pad])
+	levels.append(np.zeros(parse.fec_size(2 + 255 + 2) * 8, dtype=np.int8))
+	levels = np.concatenate(levels)
+
+	# Symbol the transmitter is sending at the time of each sample
+	symlen = sps * (1 + drift)
+	idx = (np.arange(int(len(levels) * symlen)) / symlen).astype(np.int64)
+
+	samples = levels[idx] * float(amplitude) + dc
+	if noise:
+		samples += rng.normal(0, noise, len(samples))
+
+	return np.clip(np.round(samples), -32768, 32767).astype(np.int16)
+
+def sample_stream(samples):
+	"""RawSamples reading from the rendered samples, as returned by sdr.open_fm_stream()"""
+	return sdr.RawSamples(io.BytesIO(samples.astype('<i2').tobytes()), 2, 'little', True)
+
+def fm_conf(conf, sps):
+	"""FMConfig matching samples rendered with sps samples per symbol"""
+	return sdr.FMConfig(conf.param.freq, sps * conf.param.drate)
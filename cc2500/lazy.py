@@ -0,0 +1,34 @@
+import importlib
+
+class LazyModule:
+	"""Stand-in for an optional module, imported on first attribute access
+
+	Evaluates to false if the module isn't installed, so "if not np:" works
+	where "if np is None:" did with an eager optional import.
+	"""
+	def __init__(self, name):
+		self.__dict__['name'] = name
+
+	def load(self):
+		module = self.__dict__.get('module', False)
+		if module is False:
+			try:
+				module = importlib.import_module(self.name)
+			except ImportError:
+				module = None
+			self.__dict__['module'] = module
+		return module
+
+	def __bool__(self):
+		return self.load() is not None
+
+	def __getattr__(self, key):
+		module = self.load()
+		if module is None:
+			raise ImportError('No module named %r' % self.name)
+		# Later lookups of the same name skip __getattr__()
+		value = self.__dict__[key] = getattr(module, key)
+		return value
+
+	def __repr__(self):
+		return '<lazy module %r>' % self.name
@@ -0,0 +1,95 @@
+import concurrent.futures
+import collections
+import queue
+
+from . import control
+
+# Packet received by one of the radios of a RadioManager; radio is its name
+RadioPacket = collections.namedtuple('RadioPacket', 'radio time data rssi lqi')
+
+class RadioReceiver(control.Receiver):
+	"""Receiver putting RadioPackets tagged with name in a shared queue"""
+	def __init__(self, name, control, packets):
+		super().__init__(control, packets=packets)
+		self.name = name
+
+	def deliver(self, packet):
+		try:
+			self.packets.put_nowait(RadioPacket(self.name, *packet))
+		except queue.Full:
+			self.dropped += 1
+
+class RadioManager:
+	"""Several CC2500Controls, eg. on different channels, used as one
+
+	initialize() initializes all of the radios in parallel, and once
+	started, each radio receives in its own RadioReceiver thread, so the
+	serial links are serviced concurrently. Iterating the manager yields
+	the RadioPackets of all the radios as they're received, until all of
+	the receivers have stopped.
+	"""
+	def __init__(self, controls, names=None, queue_size=control.QUEUE_SIZE):
+		self.controls = list(controls)
+		self.names = list(names) if names is not None else list(range(len(self.controls)))
+		self.packets = queue.Queue(queue_size)
+		self.receivers = {}
+
+	@classmethod
+	def open(cls, ports, confs, baudrate=115200, timeout=1):
+		"""Manager of radios on the serial ports, named by port, configured with confs (one per port)"""
+		import serial
+
+		controls = [control.CC2500Control(control.SerialSPI(serial.Serial(port, baudrate, parity='N', stopbits=1, timeout=timeout)), conf) for port, conf in zip(ports, confs)]
+		return cls(controls, ports)
+
+	def map(self, func):
+		"""Call func(control) for each radio in parallel; returns the results in order"""
+		with concurrent.futures.ThreadPoolExecutor(len(self.controls)) as executor:
+			return list(executor.map(func, self.controls))
+
+	def initialize(self, append_status=False):
+		self.map(lambda radio: radio.initialize(append_status))
+
+	def sync_config(self):
+		return self.map(lambda radio: radio.sync_config())
+
+	def start(self):
+		for name, radio in zip(self.names, self.controls):
+			self.receivers[name] = RadioReceiver(name, radio, self.packets).start()
+		return self
+
+	def stop(self, timeout=None):
+		for receiver in self.receivers.values():
+			receiver.stopping.set()
+		for receiver in self.receivers.values():
+			receiver.thread.join(timeout)
+
+	def __enter__(self):
+		return self.start()
+
+	def __exit__(self, *exc):
+		self.stop()
+
+	def send(self, radio, data):
+		"""Queue data for sending with the named radio; returns a Future"""
+		return self.receivers[radio].send(data)
+
+	def __iter__(self):
+		running = len(self.receivers)
+		while running:
+			packet = self.packets.get()
+			if packet is None:
+				running -= 1
+				continue
+			yield packet
+
+		for receiver in self.receivers.values():
+			if receiver.error is not None:
+				raise receiver.error
+
+	@property
+	def dropped(self):
+		return sum(receiver.dropped for receiver in self.receivers.values())
+
+	def format_op_stats(self):
+		return '\n'.join('%s:\n%s' % (name, radio.format_op_stats()) for name, radio in zip(self.names, self.controls))
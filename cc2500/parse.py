@@ -1,6 +1,19 @@
-import operator
+import collections
+import itertools
 import binascii
 
+from .lazy import LazyModule
+
+np = LazyModule('numpy')
+
+class ParseError(Exception):
+	"""Data given to parse() isn't a valid packet; reason is the name of the failed check"""
+	reasons = ('preamble', 'sync', 'length', 'address', 'crc')
+
+	def __init__(self, reason):
+		super().__init__(reason)
+		self.reason = reason
+
 def whitening_seq():
 	v = 0x1ff
 	while True:
@@ -8,6 +21,29 @@ def whitening_seq():
 		top = (v & 0x1e0)
 		v = (top ^ (top >> 4) ^ (top >> 8) ^ (v << 1) ^ (v << 5)) & 0x1ff
 
+# The whitening sequence repeats every 511 bytes, which also covers the longest
+# possible packet (length byte, 255 bytes of data and CRC)
+WHITENING_PERIOD = 511
+WHITENING = bytes(itertools.islice(whitening_seq(), WHITENING_PERIOD))
+
+def whitening_key(size, offset=0):
+	"""size bytes of the whitening sequence, starting at offset"""
+	offset %= WHITENING_PERIOD
+	if offset + size <= WHITENING_PERIOD:
+		return WHITENING[offset:offset+size]
+	return (WHITENING[offset:] + WHITENING * ((offset + size) // WHITENING_PERIOD))[:size]
+
+def whiten(data, offset=0):
+	"""XOR data with the whitening sequence starting at offset; also dewhitens"""
+	size = len(data)
+	key = whitening_key(size, offset)
+	return (int.from_bytes(data, 'big') ^ int.from_bytes(key, 'big')).to_bytes(size, 'big')
+
+def whiten_array(frames, offset=0):
+	"""Whiten/dewhiten the rows of a 2-D uint8 array (or a 1-D one) with NumPy"""
+	key = np.frombuffer(whitening_key(frames.shape[-1], offset), dtype=np.uint8)
+	return frames ^ key
+
 def _crc(degree, poly, crcval, data, data_bits):
 	crcval_msb = 1 << degree
 	data_msb = 1 << data_bits
@@ -18,9 +54,256 @@ def _crc(degree, poly, crcval, data, data_bits):
 			crcval ^= poly
 	return crcval
 
-def crc16(data):
+def crc16_reference(data):
+	"""Bit by bit reference implementation of crc16()"""
 	return _crc(16, 0x8005, 0xffff, int(binascii.hexlify(data), 16), 8 * len(data)) & 0xffff
 
+# CRC of a register value shifted through 8 (CRC16_TABLE) or 16 (CRC16_TABLE2) zero bits
+CRC16_TABLE = [_crc(16, 0x8005, i << 8, 0, 8) & 0xffff for i in range(256)]
+CRC16_TABLE2 = [((CRC16_TABLE[i] << 8) & 0xffff) ^ CRC16_TABLE[CRC16_TABLE[i] >> 8] for i in range(256)]
+
+def crc16(data, crcval=0xffff):
+	"""CRC-16 (polynomial 0x8005) of data, continuing from crcval
+
+	Table-driven, two bytes at a time; crc16() of data with its CRC appended is 0.
+	"""
+	table, table2 = CRC16_TABLE, CRC16_TABLE2
+	for hi, lo in zip(data[0::2], data[1::2]):
+		crcval ^= (hi << 8) | lo
+		crcval = table2[crcval >> 8] ^ table[crcval & 0xff]
+	if len(data) & 1:
+		crcval = ((crcval << 8) & 0xffff) ^ table[(crcval >> 8) ^ data[-1]]
+	return crcval
+
+def crc16_batch(frames, lengths=None):
+	"""CRC-16 of many frames at once
+
+	frames is either a sequence of byte strings, or a 2-D uint8 array with one
+	frame per row, in which case the CRCs are calculated with NumPy over the
+	first lengths[i] bytes of each row (by default, the whole row).
+	"""
+	if not np or not isinstance(frames, np.ndarray):
+		if lengths is not None:
+			frames = [frame[:length] for frame, length in zip(frames, lengths)]
+		return [crc16(frame) for frame in frames]
+
+	table = np.array(CRC16_TABLE, dtype=np.uint32)
+	crcvals = np.full(len(frames), 0xffff, dtype=np.uint32)
+	for col in range(frames.shape[1]):
+		new = ((crcvals << 8) & 0xffff) ^ table[(crcvals >> 8) ^ frames[:, col]]
+		if lengths is None:
+			crcvals = new
+		else:
+			crcvals = np.where(col < lengths, new, crcvals)
+	return crcvals
+
+# Convolutional code output symbols, indexed by the previous three input bits
+# (aka. the state) followed by the current input bit
+FEC_TABLE = [0, 3, 1, 2, 3, 0, 2, 1, 3, 0, 2, 1, 0, 3, 1, 2]
+# Appended to the data to bring the encoder to a known state (FEC_END_STATE)
+FEC_TERMINATOR = 0x0B
+FEC_END_STATE = FEC_TERMINATOR & 7
+# Interleaving of each block of 16 symbols: output symbol i is input symbol FEC_INTERLEAVE[i]
+FEC_INTERLEAVE = [(3 - (i & 3)) * 4 + 3 - (i >> 2) for i in range(16)]
+FEC_DEINTERLEAVE = [FEC_INTERLEAVE.index(i) for i in range(16)]
+
+def fec_size(size):
+	"""Size of size bytes of data after FEC encoding"""
+	return (size // 2 * 2 + 2) * 2
+
+def _symbols(data):
+	"""2-bit symbols of data, most significant first"""
+	return [(byte >> shift) & 3 for byte in data for shift in (6, 4, 2, 0)]
+
+def _unsymbols(symbols):
+	return bytes((a << 6) | (b << 4) | (c << 2) | d for a, b, c, d in zip(*[iter(symbols)] * 4))
+
+def _interleave(symbols, order):
+	return [symbols[i + j] for i in range(0, len(symbols), 16) for j in order]
+
+def fec_encode(data):
+	"""Convolutionally encode and interleave data, like the chip does with FEC_EN"""
+	data = bytes(data) + bytes([FEC_TERMINATOR]) * (2 - len(data) % 2)
+
+	symbols = []
+	state = 0
+	for byte in data:
+		for shift in range(7, -1, -1):
+			index = (state << 1) | ((byte >> shift) & 1)
+			symbols.append(FEC_TABLE[index])
+			state = index & 7
+
+	return _unsymbols(_interleave(symbols, FEC_INTERLEAVE))
+
+def fec_decode_reference(data, terminated=True):
+	"""Scalar reference implementation of fec_decode(), for a single frame"""
+	symbols = _interleave(_symbols(data[:len(data) // 4 * 4]), FEC_DEINTERLEAVE)
+
+	inf = float('inf')
+	metrics = [0] + [inf] * 7
+	decisions = []
+	for symbol in symbols:
+		new = []
+		choices = []
+		for state in range(8):
+			bit = state & 1
+			prev0, prev1 = state >> 1, (state >> 1) | 4
+			metric0 = metrics[prev0] + bin(symbol ^ FEC_TABLE[(prev0 << 1) | bit]).count('1')
+			metric1 = metrics[prev1] + bin(symbol ^ FEC_TABLE[(prev1 << 1) | bit]).count('1')
+			choices.append(metric1 < metric0)
+			new.append(min(metric0, metric1))
+		metrics = new
+		decisions.append(choices)
+
+	state = FEC_END_STATE if terminated else metrics.index(min(metrics))
+	bits = []
+	for choices in reversed(decisions):
+		bits.append(state & 1)
+		state = (state >> 1) | (choices[state] << 2)
+	bits.reverse()
+
+	return bytes(int(''.join(map(str, bits[i:i+8])), 2) for i in range(0, len(bits) - 7, 8))
+
+def _fec_step(metrics, symbol):
+	"""Add-compare-select of one time step; returns the new path metrics, less their minimum, and the decisions as bits"""
+	new = []
+	choices = 0
+	for state in range(8):
+		bit = state & 1
+		prev0, prev1 = state >> 1, (state >> 1) | 4
+		metric0 = metrics[prev0] + bin(symbol ^ FEC_TABLE[(prev0 << 1) | bit]).count('1')
+		metric1 = metrics[prev1] + bin(symbol ^ FEC_TABLE[(prev1 << 1) | bit]).count('1')
+		choices |= (metric1 < metric0) << state
+		new.append(min(metric0, metric1))
+	low = min(new)
+	return tuple(metric - low for metric in new), choices
+
+# Memoized _fec_step() results by symbol and normalized path metrics. Every state
+# is within 3 steps of the best one, so normalized metrics are at most 6 (or
+# infinite before the first 3 steps), and there are only a few hundred of them.
+_fec_steps = [{} for symbol in range(4)]
+
+def _fec_decode_single(data, terminated=True):
+	"""fec_decode() of a single frame, with a table lookup for each time step"""
+	symbols = _interleave(_symbols(data[:len(data) // 4 * 4]), FEC_DEINTERLEAVE)
+
+	metrics = (0,) + (float('inf'),) * 7
+	decisions = []
+	for symbol in symbols:
+		steps = _fec_steps[symbol]
+		step = steps.get(metrics)
+		if step is None:
+			step = steps[metrics] = _fec_step(metrics, symbol)
+		metrics, choices = step
+		decisions.append(choices)
+
+	state = FEC_END_STATE if terminated else metrics.index(min(metrics))
+	value = 0
+	for i, choices in enumerate(reversed(decisions)):
+		value |= (state & 1) << i
+		state = (state >> 1) | (((choices >> state) & 1) << 2)
+
+	return value.to_bytes(len(decisions) // 8, 'big')
+
+def fec_decode(data, terminated=True):
+	"""Deinterleave and Viterbi decode FEC encoded data
+
+	data is either bytes, or a 2-D uint8 array of frames of the same size to
+	decode at once, with the add-compare-select steps vectorized over the
+	frames (and states) with NumPy. Single frames are decoded with a lookup
+	table of the steps instead, as vectorizing over just the 8 states costs
+	more than it saves. The decoded data still includes the trellis
+	terminator. If terminated is false, data can be any prefix of the encoded
+	data (of a multiple of 4 bytes), and the most likely end state is used
+	for the traceback.
+	"""
+	if not np or not isinstance(data, np.ndarray):
+		return _fec_decode_single(bytes(data), terminated)
+
+	frames = data
+	frames = frames[:, :frames.shape[1] // 4 * 4]
+	count = len(frames)
+
+	# Symbols in deinterleaved order, one column per time step
+	symbols = (frames[:, :, None] >> np.array([6, 4, 2, 0], dtype=np.uint8)) & 3
+	symbols = symbols.reshape(count, -1, 16)[:, :, FEC_DEINTERLEAVE].reshape(count, -1)
+
+	states = np.arange(8)
+	bits = states & 1
+	prev0, prev1 = states >> 1, (states >> 1) | 4
+	table = np.array(FEC_TABLE)
+	popcount = np.array([0, 1, 1, 2], dtype=np.int32)
+	# Branch metrics for each received symbol value
+	branch0 = popcount[np.arange(4)[:, None] ^ table[(prev0 << 1) | bits]]
+	branch1 = popcount[np.arange(4)[:, None] ^ table[(prev1 << 1) | bits]]
+
+	# Branch metrics of all time steps at once, time major
+	branch0 = np.ascontiguousarray(branch0[symbols.T])
+	branch1 = np.ascontiguousarray(branch1[symbols.T])
+
+	metrics = np.full((count, 8), 1 << 20, dtype=np.int32)
+	metrics[:, 0] = 0
+	metric0 = np.empty_like(metrics)
+	metric1 = np.empty_like(metrics)
+	decisions = np.zeros((symbols.shape[1], count, 8), dtype=bool)
+	for t in range(symbols.shape[1]):
+		np.add(metrics[:, prev0], branch0[t], out=metric0)
+		np.add(metrics[:, prev1], branch1[t], out=metric1)
+		np.less(metric1, metric0, out=decisions[t])
+		np.minimum(metric0, metric1, out=metrics)
+
+	if terminated:
+		state = np.full(count, FEC_END_STATE)
+	else:
+		state = metrics.argmin(axis=1)
+
+	rows = np.arange(count)
+	out = np.zeros((count, symbols.shape[1]), dtype=np.uint8)
+	for t in range(symbols.shape[1] - 1, -1, -1):
+		out[:, t] = state & 1
+		state = (state >> 1) | (decisions[t, rows, state] << 2)
+
+	return np.packbits(out, axis=1)
+
+# Manchester chip pairs for data bits 0 and 1, first chip in the more significant bit
+MANCHESTER_CHIPS = (0b01, 0b10)
+
+def _manchester_tables():
+	encode = [0] * 256
+	for byte in range(256):
+		for shift in range(7, -1, -1):
+			encode[byte] = (encode[byte] << 2) | MANCHESTER_CHIPS[(byte >> shift) & 1]
+
+	# Per byte of chips: the four data bits (shifted to the high or low nibble) and the number of symbol violations
+	high, low, violations = bytearray(256), bytearray(256), bytearray(256)
+	for chips in range(256):
+		bits = 0
+		for shift in (6, 4, 2, 0):
+			pair = (chips >> shift) & 3
+			bits = (bits << 1) | (pair >> 1)
+			violations[chips] += pair not in MANCHESTER_CHIPS
+		high[chips], low[chips] = bits << 4, bits
+
+	return encode, bytes(high), bytes(low), bytes(violations)
+
+MANCHESTER_ENCODE, MANCHESTER_HIGH, MANCHESTER_LOW, MANCHESTER_VIOLATIONS = _manchester_tables()
+
+def manchester_encode(data):
+	"""Manchester chips of data, two bytes for each byte"""
+	return b''.join(MANCHESTER_ENCODE[byte].to_bytes(2, 'big') for byte in data)
+
+def manchester_decode(data):
+	"""Decode Manchester chips; returns (data, number of symbol violations)
+
+	A violation is a chip pair with no transition; the first chip of such a
+	pair is taken as the data bit.
+	"""
+	data = bytes(data[:len(data) // 2 * 2])
+	size = len(data) // 2
+	high = int.from_bytes(data[0::2].translate(MANCHESTER_HIGH), 'big')
+	low = int.from_bytes(data[1::2].translate(MANCHESTER_LOW), 'big')
+	return (high | low).to_bytes(size, 'big'), sum(data.translate(MANCHESTER_VIOLATIONS))
+
 def get_sync_data(conf):
 	preamble = b'\xAA'
 	preamble *= [2, 3, 4, 6, 8, 12, 16, 24][conf.field.NUM_PREAMBLE]
@@ -34,7 +317,14 @@ def get_sync_data(conf):
 
 	return preamble, sync_word
 
-def make_parser(conf):
+PacketFormat = collections.namedtuple('PacketFormat', 'preamble sync_word own_length length_size addr_size crc_size white_data fec manchester valid_addrs max_size base_size')
+
+def packet_format(conf, allow_infinite=False):
+	"""Packet format settings of conf, as needed for parsing packets
+
+	In infinite packet length mode (only allowed with allow_infinite),
+	own_length and the sizes derived from it are meaningless.
+	"""
 	own_length = conf.field.PACKET_LENGTH
 	addr_mode = conf.field.ADR_CHK
 	white_data = conf.field.WHITE_DATA
@@ -43,11 +333,12 @@ def make_parser(conf):
 	own_addr = conf.field.DEVICE_ADDR
 
 	assert not conf.field.CC2400_EN, 'CC2400 mode not supported (yet)'
-	assert length_mode in {0, 1}, 'Infinite packet length not supported'
-	assert not conf.field.MANCHESTER_EN, 'Manchester encoding not supported (yet)'
-	assert not conf.field.FEC_EN, 'FEC not supported (yet)'
+	assert length_mode in ({0, 1, 2} if allow_infinite else {0, 1}), 'Infinite packet length not supported'
 
 	preamble, sync_word = get_sync_data(conf)
+	fec = bool(conf.field.FEC_EN)
+	manchester = bool(conf.field.MANCHESTER_EN)
+	assert not (fec and manchester), 'FEC and Manchester encoding can\'t be used together'
 	length_size = int(length_mode == 1)
 	addr_size = int(addr_mode != 0)
 	crc_size = 2 * crc_en
@@ -58,31 +349,67 @@ def make_parser(conf):
 	if addr_mode > 2:
 		valid_addrs.add(0xff)
 
+	# The most data after the sync word that can belong to a packet
+	max_size = length_size + own_length + crc_size
+
 	# The size that needs to be added to the length of the payload returned by parse() to get the full raw size
 	base_size = len(preamble) + len(sync_word) + length_size + addr_size + crc_size
 
+	return PacketFormat(preamble, sync_word, own_length, length_size, addr_size, crc_size, white_data, fec, manchester, valid_addrs, max_size, base_size)
+
+def make_parser(conf, manchester=None):
+	"""Returns (base_size, parse) where parse(data) returns (addr, payload) of the packet in data
+
+	data is the raw on-air bytes, starting from the preamble. With Manchester
+	encoding, those are the chips, unless manchester is false, in which case
+	parse() expects data that has already been decoded.
+	"""
+	preamble, sync_word, own_length, length_size, addr_size, crc_size, white_data, fec, conf_manchester, valid_addrs, max_size, base_size = packet_format(conf)
+	if manchester is None:
+		manchester = conf_manchester
+
 	def parse(data):
-		assert data[:len(preamble)] == preamble
+		if manchester:
+			data = manchester_decode(data[:2*(len(preamble)+len(sync_word)+max_size)])[0]
+
+		if data[:len(preamble)] != preamble:
+			raise ParseError('preamble')
 		data = data[len(preamble):]
-		assert data[:len(sync_word)] == sync_word
+		if data[:len(sync_word)] != sync_word:
+			raise ParseError('sync')
 		data = data[len(sync_word):]
 
+		if fec:
+			size = max_size
+			if length_size:
+				# Decode just enough to see the length
+				length = fec_decode(data[:8], terminated=False)[0]
+				if white_data:
+					length ^= WHITENING[0]
+				if length > own_length:
+					raise ParseError('length')
+				size = length_size + length + crc_size
+			data = fec_decode(data[:fec_size(size)])[:size]
+
 		if white_data:
-			data = bytes(map(operator.xor, data, whitening_seq()))
+			data = whiten(data[:max_size])
 
 		length = own_length
 		if length_size:
 			length = data[0]
-			assert length <= own_length
+			if length > own_length:
+				raise ParseError('length')
 
 		addr = None
 		if addr_size:
 			addr = data[length_size]
-			assert addr in valid_addrs
+			if addr not in valid_addrs:
+				raise ParseError('address')
 
-		if crc_en:
+		if crc_size:
 			data = data[:length_size+length+crc_size]
-			assert crc16(data) == 0
+			if crc16(data) != 0:
+				raise ParseError('crc')
 
 		payload = data[length_size+addr_size:length_size+length]
 
@@ -90,3 +417,255 @@ def make_parser(conf):
 
 	return base_size, parse
 
+def make_encoder(conf):
+	"""Inverse of make_parser(): functions for building raw on-air frames from payloads
+
+	Returns (encode, encode_many). encode(payload, addr=None) returns the frame
+	of a single payload, addressed to the configured device address unless
+	addr is given. encode_many(payloads, addr=None) encodes all payloads into
+	one contiguous bytearray and returns it along with the offsets of the
+	frames in it (len(payloads) + 1 of them, the last one being the end).
+	"""
+	preamble, sync_word, own_length, length_size, addr_size, crc_size, white_data, fec, manchester, valid_addrs, max_size, base_size = packet_format(conf)
+	prefix = preamble + sync_word
+	own_addr = conf.field.DEVICE_ADDR
+	key = int.from_bytes(whitening_key(max_size), 'big')
+
+	def encode(payload, addr=None):
+		length = addr_size + len(payload)
+		if length > own_length or (not length_size and length != own_length):
+			raise ValueError('Payload size %d does not match packet length %d' % (len(payload), own_length))
+
+		data = bytes(payload)
+		if addr_size:
+			data = bytes([own_addr if addr is None else addr]) + data
+		if length_size:
+			data = bytes([length]) + data
+		if crc_size:
+			data += crc16(data).to_bytes(2, 'big')
+		if white_data:
+			size = len(data)
+			data = (int.from_bytes(data, 'big') ^ (key >> 8 * (max_size - size))).to_bytes(size, 'big')
+		if fec:
+			data = fec_encode(data)
+		if manchester:
+			return manchester_encode(prefix + data)
+
+		return prefix + data
+
+	def encode_many(payloads, addr=None):
+		buf = bytearray()
+		offsets = [0]
+		for payload in payloads:
+			buf += encode(payload, addr)
+			offsets.append(len(buf))
+		return buf, offsets
+
+	return encode, encode_many
+
+class StreamParser:
+	"""Incremental parser for packets of any length, including infinite packet length mode
+
+	Feed the bytes following the sync word to feed() as they become
+	available; it returns a list of the payload chunks they contained.
+	Dewhitening and the CRC are updated as the data arrives, so memory use
+	doesn't depend on the packet length. Once the packet has ended (or an
+	error has been detected), done is set and further data is ignored; error
+	is then None or one of ParseError.reasons, and crc_ok tells whether the
+	CRC matched (None if CRC is disabled).
+
+	In infinite packet length mode the packet never ends by itself; like with
+	the chip, call end_after() once the number of remaining bytes is known.
+	"""
+	def __init__(self, conf):
+		fmt = packet_format(conf, allow_infinite=True)
+		assert not fmt.fec, 'FEC not supported (yet)'
+		assert not fmt.manchester, 'Manchester encoding not supported (yet)'
+		self.infinite = conf.field.LENGTH_CONFIG == 2
+		self.own_length = fmt.own_length
+		self.length_size = fmt.length_size
+		self.addr_size = fmt.addr_size
+		self.crc_size = fmt.crc_size
+		self.white_data = fmt.white_data
+		self.valid_addrs = fmt.valid_addrs
+		self.reset()
+
+	def reset(self):
+		"""Start parsing a new packet"""
+		self.pos = 0
+		self.crcval = 0xffff
+		self.addr = None
+		self.length = None
+		self.header = b''
+		self.done = False
+		self.error = None
+		self.crc_ok = None
+
+		# Offset of the end of the payload, if known
+		self.payload_end = None
+		if not self.length_size and not self.infinite:
+			self.length = self.own_length
+			self.payload_end = self.own_length
+
+	def end_after(self, count):
+		"""End the packet after count more payload bytes, followed by the CRC"""
+		self.payload_end = max(self.pos, self.length_size + self.addr_size) + count
+
+	def _fail(self, reason):
+		self.done = True
+		self.error = reason
+
+	def feed(self, data):
+		if self.done or not data:
+			return []
+
+		if self.white_data:
+			data = whiten(data, self.pos)
+
+		start = self.pos
+		header_size = self.length_size + self.addr_size
+		if start < header_size:
+			self.header += data[:header_size - start]
+			if self.length_size and len(self.header) == header_size:
+				self.length = self.header[0]
+				self.payload_end = self.length_size + self.length
+
+		# Don't consume anything past the end of the packet
+		if self.payload_end is not None:
+			data = data[:self.payload_end + self.crc_size - start]
+
+		self.pos += len(data)
+		if self.crc_size:
+			self.crcval = crc16(data, self.crcval)
+
+		# Check the header once it's complete
+		if start < header_size:
+			if len(self.header) < header_size:
+				return []
+
+			if self.length_size and self.length > self.own_length:
+				self._fail('length')
+				return []
+
+			if self.addr_size:
+				self.addr = self.header[self.length_size]
+				if self.addr not in self.valid_addrs:
+					self._fail('address')
+					return []
+
+		chunks = []
+		payload_end = self.pos if self.payload_end is None else self.payload_end
+		chunk = data[max(header_size - start, 0):max(payload_end - start, 0)]
+		if chunk:
+			chunks.append(chunk)
+
+		if self.payload_end is not None and self.pos >= self.payload_end + self.crc_size:
+			self.done = True
+			if self.crc_size:
+				self.crc_ok = self.crcval == 0
+				if not self.crc_ok:
+					self.error = 'crc'
+
+		return chunks
+
+# Status codes of the frames parsed by make_batch_parser(); the rest follow ParseError.reasons
+STATUS_OK = 0
+STATUS_PREAMBLE, STATUS_SYNC, STATUS_LENGTH, STATUS_ADDRESS, STATUS_CRC = range(1, len(ParseError.reasons) + 1)
+STATUS_SHORT = len(ParseError.reasons) + 1
+STATUS_NAMES = ('ok',) + ParseError.reasons + ('short',)
+
+class ParsedFrames(collections.namedtuple('ParsedFrames', 'status addr length payload_start payload_end crc_ok data')):
+	"""Columnar results of a batch parser, one array element per frame
+
+	data holds the dewhitened frames after the sync word, and the payload of
+	frame i is data[i, payload_start[i]:payload_end[i]]. addr is -1 if the
+	packets don't have an address.
+	"""
+	def payload(self, i):
+		return self.data[i, self.payload_start[i]:self.payload_end[i]].tobytes()
+
+	def payloads(self):
+		"""(addr, payload) of the valid frames, like the parser returns"""
+		return [(None if self.addr[i] < 0 else int(self.addr[i]), self.payload(i)) for i in np.flatnonzero(self.status == STATUS_OK)]
+
+def frame_array(frames):
+	"""2-D uint8 array and lengths of a sequence of byte strings, padded with zeros"""
+	lengths = np.array([len(frame) for frame in frames], dtype=np.int64)
+	array = np.zeros((len(frames), lengths.max(initial=0)), dtype=np.uint8)
+	for row, frame in zip(array, frames):
+		row[:len(frame)] = np.frombuffer(frame, dtype=np.uint8)
+	return array, lengths
+
+def make_batch_parser(conf):
+	"""Like make_parser(), but parse() takes many frames and doesn't raise
+
+	The frames are given as a 2-D uint8 array with one frame per row (and
+	optionally, the valid length of each row), or as a sequence of byte
+	strings. A ParsedFrames with the status of each frame is returned.
+	"""
+	assert np, 'Batch parsing requires NumPy'
+
+	preamble, sync_word, own_length, length_size, addr_size, crc_size, white_data, fec, manchester, valid_addrs, max_size, base_size = packet_format(conf)
+	assert not fec, 'FEC not supported (yet)'
+	assert not manchester, 'Manchester encoding not supported (yet)'
+	prefix = np.frombuffer(preamble + sync_word, dtype=np.uint8)
+	valid_addrs = np.array(sorted(valid_addrs), dtype=np.uint8)
+
+	def parse(frames, lengths=None):
+		if not isinstance(frames, np.ndarray):
+			frames, lengths = frame_array(frames)
+		if lengths is None:
+			lengths = np.full(len(frames), frames.shape[1], dtype=np.int64)
+
+		# Pad so that every frame has room for a full packet
+		width = len(prefix) + max_size
+		if frames.shape[1] < width:
+			frames = np.pad(frames, ((0, 0), (0, width - frames.shape[1])))
+
+		preamble_ok = (frames[:, :len(preamble)] == prefix[:len(preamble)]).all(axis=1)
+		sync_ok = (frames[:, len(preamble):len(prefix)] == prefix[len(preamble):]).all(axis=1)
+
+		data = frames[:, len(prefix):width]
+		if white_data:
+			data = whiten_array(data)
+
+		if length_size:
+			length = data[:, 0].astype(np.int64)
+		else:
+			length = np.full(len(data), own_length, dtype=np.int64)
+		length_ok = length <= own_length
+
+		if addr_size:
+			addr = data[:, length_size].astype(np.int16)
+			addr_ok = np.isin(addr, valid_addrs)
+		else:
+			addr = np.full(len(data), -1, dtype=np.int16)
+			addr_ok = np.ones(len(data), dtype=bool)
+
+		size = length_size + np.minimum(length, own_length) + crc_size
+		if crc_size:
+			crc_ok = crc16_batch(data, size) == 0
+		else:
+			crc_ok = np.ones(len(data), dtype=bool)
+
+		short = lengths < len(prefix) + size
+		# A frame cut before the length or address byte is just short
+		length_ok |= lengths <= len(prefix)
+		addr_ok |= lengths <= len(prefix) + length_size
+
+		# Later checks are applied first, so that the first failing check sets the status; a short
+		# frame can still fail the header checks, like make_parser() does, but not the CRC check
+		status = np.full(len(data), STATUS_OK, dtype=np.uint8)
+		status[~crc_ok] = STATUS_CRC
+		status[short] = STATUS_SHORT
+		status[~addr_ok] = STATUS_ADDRESS
+		status[~length_ok] = STATUS_LENGTH
+		status[~sync_ok] = STATUS_SYNC
+		status[~preamble_ok] = STATUS_PREAMBLE
+
+		payload_start = np.full(len(data), length_size + addr_size, dtype=np.int64)
+		payload_end = length_size + length
+
+		return ParsedFrames(status, addr, length, payload_start, payload_end, crc_ok, data)
+
+	return base_size, parse
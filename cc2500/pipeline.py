@@ -0,0 +1,188 @@
+import multiprocessing
+import threading
+import queue
+import time
+import sys
+
+from . import config
+from . import sdr
+
+# Bytes drained from the rtl_fm pipe per read
+BLOCK_SIZE = 16384
+# Blocks/packets each queue can hold before the producing stage starts dropping
+QUEUE_SIZE = 256
+# Bytes per sample of the rtl_fm output
+SAMPLE_SIZE = 2
+
+class SampleAligner:
+	"""Cuts byte blocks to whole samples, carrying a partial sample at the end over to the next block
+
+	Blocks are queued and dropped whole, so a block ending mid-sample would
+	shift every sample after it by a byte.
+	"""
+	def __init__(self, size=SAMPLE_SIZE):
+		self.size = size
+		self.rest = b''
+
+	def __call__(self, data):
+		if self.rest:
+			data = self.rest + data
+		cut = len(data) - len(data) % self.size
+		self.rest = data[cut:]
+		return data[:cut]
+
+class QueueReader:
+	"""File-like object reading the byte chunks put into a queue; None marks the end"""
+	def __init__(self, queue):
+		self.queue = queue
+		self.chunk = b''
+		self.pos = 0
+		self.eof = False
+
+	def readinto(self, buf):
+		view = memoryview(buf).cast('B')
+		while self.pos >= len(self.chunk):
+			if self.eof:
+				return 0
+			chunk = self.queue.get()
+			if chunk is None:
+				self.eof = True
+				return 0
+			self.chunk, self.pos = chunk, 0
+
+		n = min(len(view), len(self.chunk) - self.pos)
+		view[:n] = self.chunk[self.pos:self.pos+n]
+		self.pos += n
+		return n
+
+	def read(self, size):
+		buf = bytearray(size)
+		view = memoryview(buf)
+		pos = 0
+		while pos < size:
+			n = self.readinto(view[pos:])
+			if not n:
+				break
+			pos += n
+		return bytes(buf[:pos])
+
+def _detect(reg_values, fxosc, sdr_conf, fm, engine, in_queue, out_queue, dropped):
+	"""Detection stage: parse the sample blocks from in_queue, put packets to out_queue"""
+	conf = config.CC2500Config(reg_values, fxosc)
+	samples = sdr.RawSamples(QueueReader(in_queue), 2, 'little', True)
+
+	try:
+		for packet in sdr.parse_stream(samples, conf, sdr_conf, fm, engine):
+			try:
+				out_queue.put_nowait(packet)
+			except queue.Full:
+				with dropped.get_lock():
+					dropped.value += 1
+	except KeyboardInterrupt:
+		pass
+	finally:
+		out_queue.put(None)
+
+class Pipeline:
+	"""Live decoding split into reader, detection and output stages
+
+	The reader thread drains the rtl_fm pipe continuously, so a stall in
+	a later stage drops sample blocks (counted in overruns) instead of
+	backing up the pipe. Detection runs in a worker process by default, or
+	in a thread with use_process=False; iterating the pipeline is the
+	output stage.
+	"""
+	def __init__(self, conf, sdr_conf, fm=None, engine=None, use_process=True, queue_size=QUEUE_SIZE, report_interval=1.0):
+		self.conf = conf
+		self.sdr = sdr_conf
+		self.fm = fm or sdr.get_decoder(conf).fm
+		self.engine = engine
+		self.use_process = use_process
+		self.queue_size = queue_size
+		self.report_interval = report_interval
+
+		self.blocks = 0
+		self.bytes = 0
+		self.overruns = 0
+		self.packets = 0
+		self.max_backlog = 0
+		self.packet_overruns = multiprocessing.Value('L', 0)
+		self.last_report = {}
+
+	def report(self, stage, msg):
+		"""Report a stage falling behind, at most once per report_interval; returns whether it was reported"""
+		now = time.monotonic()
+		if now - self.last_report.get(stage, 0) >= self.report_interval:
+			self.last_report[stage] = now
+			print('%s: %s' % (stage, msg), file=sys.stderr)
+			return True
+		return False
+
+	def _read(self, f, raw_queue):
+		align = SampleAligner()
+		while True:
+			data = f.read1(BLOCK_SIZE)
+			if not data:
+				break
+			data = align(data)
+			if not data:
+				continue
+
+			self.blocks += 1
+			self.bytes += len(data)
+			try:
+				raw_queue.put_nowait(data)
+			except queue.Full:
+				self.overruns += 1
+				self.report('detection', 'falling behind, %d sample blocks dropped' % self.overruns)
+
+			backlog = raw_queue.qsize()
+			if backlog > self.max_backlog:
+				self.max_backlog = backlog
+
+		raw_queue.put(None)
+
+	def __iter__(self):
+		if self.use_process:
+			raw_queue = multiprocessing.Queue(self.queue_size)
+			out_queue = multiprocessing.Queue(self.queue_size)
+			worker_cls = multiprocessing.Process
+		else:
+			raw_queue = queue.Queue(self.queue_size)
+			out_queue = queue.Queue(self.queue_size)
+			worker_cls = threading.Thread
+
+		p, s = sdr.open_fm_stream(self.sdr, self.fm)
+
+		args = (bytes(self.conf.reg_values), self.conf.fxosc, self.sdr, self.fm, self.engine, raw_queue, out_queue, self.packet_overruns)
+		worker = worker_cls(target=_detect, args=args, daemon=True)
+		reader = threading.Thread(target=self._read, args=(s.f, raw_queue), daemon=True)
+
+		worker.start()
+		reader.start()
+
+		reported = 0
+		try:
+			while True:
+				packet = out_queue.get()
+				if packet is None:
+					break
+
+				self.packets += 1
+				dropped = self.packet_overruns.value
+				if dropped > reported and self.report('output', 'falling behind, %d packets dropped' % dropped):
+					reported = dropped
+
+				yield packet
+		finally:
+			p.terminate()
+			p.wait()
+			reader.join(1)
+			if self.use_process:
+				worker.join(1)
+				if worker.is_alive():
+					worker.terminate()
+
+	def format_stats(self):
+		return 'blocks=%d bytes=%d overruns=%d max_backlog=%d packets=%d packet_overruns=%d' % (
+			self.blocks, self.bytes, self.overruns, self.max_backlog, self.packets, self.packet_overruns.value)
@@ -0,0 +1,420 @@
+# Generated from config.reg_data by "python3 -m cc2500.config --gen-tables", do not edit
+
+reg_data_crc = 0x653074ae
+
+reg_defs = [('IOCFG2', [((6, 6), 'GDO2_INV', (0, 0)), ((5, 0), 'GDO2_CFG', (5, 0))]),
+ ('IOCFG1', [((7, 7), 'GDO_DS', (0, 0)), ((6, 6), 'GDO1_INV', (0, 0)), ((5, 0), 'GDO1_CFG', (5, 0))]),
+ ('IOCFG0', [((7, 7), 'TEMP_SENSOR_ENABLE', (0, 0)), ((6, 6), 'GDO0_INV', (0, 0)), ((5, 0), 'GDO0_CFG', (5, 0))]),
+ ('FIFOTHR', [((3, 0), 'FIFO_THR', (3, 0))]),
+ ('SYNC1', [((7, 0), 'SYNC', (15, 8))]),
+ ('SYNC0', [((7, 0), 'SYNC', (7, 0))]),
+ ('PKTLEN', [((7, 0), 'PACKET_LENGTH', (7, 0))]),
+ ('PKTCTRL1',
+  [((7, 5), 'PQT', (2, 0)),
+   ((3, 3), 'CRC_AUTOFLUSH', (0, 0)),
+   ((2, 2), 'APPEND_STATUS', (0, 0)),
+   ((1, 0), 'ADR_CHK', (1, 0))]),
+ ('PKTCTRL0',
+  [((6, 6), 'WHITE_DATA', (0, 0)),
+   ((5, 4), 'PKT_FORMAT', (1, 0)),
+   ((3, 3), 'CC2400_EN', (0, 0)),
+   ((2, 2), 'CRC_EN', (0, 0)),
+   ((1, 0), 'LENGTH_CONFIG', (1, 0))]),
+ ('ADDR', [((7, 0), 'DEVICE_ADDR', (7, 0))]),
+ ('CHANNR', [((7, 0), 'CHAN', (7, 0))]),
+ ('FSCTRL1', [((4, 0), 'FREQ_IF', (4, 0))]),
+ ('FSCTRL0', [((7, 0), 'FREQOFF', (7, 0))]),
+ ('FREQ2', [((7, 6), 'FREQ', (23, 22)), ((5, 0), 'FREQ', (21, 16))]),
+ ('FREQ1', [((7, 0), 'FREQ', (15, 8))]),
+ ('FREQ0', [((7, 0), 'FREQ', (7, 0))]),
+ ('MDMCFG4', [((7, 6), 'CHANBW_E', (1, 0)), ((5, 4), 'CHANBW_M', (1, 0)), ((3, 0), 'DRATE_E', (3, 0))]),
+ ('MDMCFG3', [((7, 0), 'DRATE_M', (7, 0))]),
+ ('MDMCFG2',
+  [((7, 7), 'DEM_DCFILT_OFF', (0, 0)),
+   ((6, 4), 'MOD_FORMAT', (2, 0)),
+   ((3, 3), 'MANCHESTER_EN', (0, 0)),
+   ((2, 0), 'SYNC_MODE', (2, 0))]),
+ ('MDMCFG1', [((7, 7), 'FEC_EN', (0, 0)), ((6, 4), 'NUM_PREAMBLE', (2, 0)), ((1, 0), 'CHANSPC_E', (1, 0))]),
+ ('MDMCFG0', [((7, 0), 'CHANSPC_M', (7, 0))]),
+ ('DEVIATN', [((6, 4), 'DEVIATION_E', (2, 0)), ((2, 0), 'DEVIATION_M', (2, 0))]),
+ ('MCSM2', [((4, 4), 'RX_TIME_RSSI', (0, 0)), ((3, 3), 'RX_TIME_QUAL', (0, 0)), ((2, 0), 'RX_TIME', (2, 0))]),
+ ('MCSM1', [((5, 4), 'CCA_MODE', (1, 0)), ((3, 2), 'RXOFF_MODE', (1, 0)), ((1, 0), 'TXOFF_MODE', (1, 0))]),
+ ('MCSM0',
+  [((5, 4), 'FS_AUTOCAL', (1, 0)),
+   ((3, 2), 'PO_TIMEOUT', (1, 0)),
+   ((1, 1), 'PIN_CTRL_EN', (0, 0)),
+   ((0, 0), 'XOSC_FORCE_ON', (0, 0))]),
+ ('FOCCFG',
+  [((5, 5), 'FOC_BS_CS_GATE', (0, 0)),
+   ((4, 3), 'FOC_PRE_K', (1, 0)),
+   ((2, 2), 'FOC_POST_K', (0, 0)),
+   ((1, 0), 'FOC_LIMIT', (1, 0))]),
+ ('BSCFG',
+  [((7, 6), 'BS_PRE_KI', (1, 0)),
+   ((5, 4), 'BS_PRE_KP', (1, 0)),
+   ((3, 3), 'BS_POST_KI', (0, 0)),
+   ((2, 2), 'BS_POST_KP', (0, 0)),
+   ((1, 0), 'BS_LIMIT', (1, 0))]),
+ ('AGCCTRL2', [((7, 6), 'MAX_DVGA_GAIN', (1, 0)), ((5, 3), 'MAX_LNA_GAIN', (2, 0)), ((2, 0), 'MAGN_TARGET', (2, 0))]),
+ ('AGCCTRL1',
+  [((6, 6), 'AGC_LNA_PRIORITY', (0, 0)),
+   ((5, 4), 'CARRIER_SENSE_REL_THR', (1, 0)),
+   ((3, 0), 'CARRIER_SENSE_ABS_THR', (3, 0))]),
+ ('AGCCTRL0',
+  [((7, 6), 'HYST_LEVEL', (1, 0)),
+   ((5, 4), 'WAIT_TIME', (1, 0)),
+   ((3, 2), 'AGC_FREEZE', (1, 0)),
+   ((1, 0), 'FILTER_LENGTH', (1, 0))]),
+ ('WOREVT1', [((7, 0), 'EVENT0', (15, 8))]),
+ ('WOREVT0', [((7, 0), 'EVENT0', (7, 0))]),
+ ('WORCTRL',
+  [((7, 7), 'RC_PD', (0, 0)), ((6, 4), 'EVENT1', (2, 0)), ((3, 3), 'RC_CAL', (0, 0)), ((1, 0), 'WOR_RES', (1, 0))]),
+ ('FREND1',
+  [((7, 6), 'LNA_CURRENT', (1, 0)),
+   ((5, 4), 'LNA2MIX_CURRENT', (1, 0)),
+   ((3, 2), 'LODIV_BUF_CURRENT_RX', (1, 0)),
+   ((1, 0), 'MIX_CURRENT', (1, 0))]),
+ ('FREND0', [((5, 4), 'LODIV_BUF_CURRENT_TX', (1, 0)), ((2, 0), 'PA_POWER', (2, 0))]),
+ ('FSCAL3', [((7, 6), 'FSCAL', (23, 22)), ((5, 4), 'CHP_CURR_CAL_EN', (1, 0)), ((3, 0), 'FSCAL', (21, 18))]),
+ ('FSCAL2', [((5, 5), 'VCO_CORE_H_EN', (0, 0)), ((4, 0), 'FSCAL', (17, 13))]),
+ ('FSCAL1', [((5, 0), 'FSCAL', (12, 7))]),
+ ('FSCAL0', [((6, 0), 'FSCAL', (6, 0))]),
+ ('RCCTRL1', [((6, 0), 'RCCTRL1', (6, 0))]),
+ ('RCCTRL0', [((6, 0), 'RCCTRL0', (6, 0))]),
+ ('FSTEST', [((7, 0), 'FSTEST', (7, 0))]),
+ ('PTEST', [((7, 0), 'PTEST', (7, 0))]),
+ ('AGCTEST', [((7, 0), 'AGCTEST', (7, 0))]),
+ ('TEST2', [((7, 0), 'TEST2', (7, 0))]),
+ ('TEST1', [((7, 0), 'TEST1', (7, 0))]),
+ ('TEST0', [((7, 2), 'TEST0', (6, 1)), ((1, 1), 'VCO_SEL_CAL_EN', (0, 0)), ((0, 0), 'TEST0', (0, 0))])]
+
+field_defs = {'GDO2_INV': [((0, 0), 'IOCFG2', (6, 6))],
+ 'GDO2_CFG': [((5, 0), 'IOCFG2', (5, 0))],
+ 'GDO_DS': [((0, 0), 'IOCFG1', (7, 7))],
+ 'GDO1_INV': [((0, 0), 'IOCFG1', (6, 6))],
+ 'GDO1_CFG': [((5, 0), 'IOCFG1', (5, 0))],
+ 'TEMP_SENSOR_ENABLE': [((0, 0), 'IOCFG0', (7, 7))],
+ 'GDO0_INV': [((0, 0), 'IOCFG0', (6, 6))],
+ 'GDO0_CFG': [((5, 0), 'IOCFG0', (5, 0))],
+ 'FIFO_THR': [((3, 0), 'FIFOTHR', (3, 0))],
+ 'SYNC': [((15, 8), 'SYNC1', (7, 0)), ((7, 0), 'SYNC0', (7, 0))],
+ 'PACKET_LENGTH': [((7, 0), 'PKTLEN', (7, 0))],
+ 'PQT': [((2, 0), 'PKTCTRL1', (7, 5))],
+ 'CRC_AUTOFLUSH': [((0, 0), 'PKTCTRL1', (3, 3))],
+ 'APPEND_STATUS': [((0, 0), 'PKTCTRL1', (2, 2))],
+ 'ADR_CHK': [((1, 0), 'PKTCTRL1', (1, 0))],
+ 'WHITE_DATA': [((0, 0), 'PKTCTRL0', (6, 6))],
+ 'PKT_FORMAT': [((1, 0), 'PKTCTRL0', (5, 4))],
+ 'CC2400_EN': [((0, 0), 'PKTCTRL0', (3, 3))],
+ 'CRC_EN': [((0, 0), 'PKTCTRL0', (2, 2))],
+ 'LENGTH_CONFIG': [((1, 0), 'PKTCTRL0', (1, 0))],
+ 'DEVICE_ADDR': [((7, 0), 'ADDR', (7, 0))],
+ 'CHAN': [((7, 0), 'CHANNR', (7, 0))],
+ 'FREQ_IF': [((4, 0), 'FSCTRL1', (4, 0))],
+ 'FREQOFF': [((7, 0), 'FSCTRL0', (7, 0))],
+ 'FREQ': [((23, 22), 'FREQ2', (7, 6)),
+          ((21, 16), 'FREQ2', (5, 0)),
+          ((15, 8), 'FREQ1', (7, 0)),
+          ((7, 0), 'FREQ0', (7, 0))],
+ 'CHANBW_E': [((1, 0), 'MDMCFG4', (7, 6))],
+ 'CHANBW_M': [((1, 0), 'MDMCFG4', (5, 4))],
+ 'DRATE_E': [((3, 0), 'MDMCFG4', (3, 0))],
+ 'DRATE_M': [((7, 0), 'MDMCFG3', (7, 0))],
+ 'DEM_DCFILT_OFF': [((0, 0), 'MDMCFG2', (7, 7))],
+ 'MOD_FORMAT': [((2, 0), 'MDMCFG2', (6, 4))],
+ 'MANCHESTER_EN': [((0, 0), 'MDMCFG2', (3, 3))],
+ 'SYNC_MODE': [((2, 0), 'MDMCFG2', (2, 0))],
+ 'FEC_EN': [((0, 0), 'MDMCFG1', (7, 7))],
+ 'NUM_PREAMBLE': [((2, 0), 'MDMCFG1', (6, 4))],
+ 'CHANSPC_E': [((1, 0), 'MDMCFG1', (1, 0))],
+ 'CHANSPC_M': [((7, 0), 'MDMCFG0', (7, 0))],
+ 'DEVIATION_E': [((2, 0), 'DEVIATN', (6, 4))],
+ 'DEVIATION_M': [((2, 0), 'DEVIATN', (2, 0))],
+ 'RX_TIME_RSSI': [((0, 0), 'MCSM2', (4, 4))],
+ 'RX_TIME_QUAL': [((0, 0), 'MCSM2', (3, 3))],
+ 'RX_TIME': [((2, 0), 'MCSM2', (2, 0))],
+ 'CCA_MODE': [((1, 0), 'MCSM1', (5, 4))],
+ 'RXOFF_MODE': [((1, 0), 'MCSM1', (3, 2))],
+ 'TXOFF_MODE': [((1, 0), 'MCSM1', (1, 0))],
+ 'FS_AUTOCAL': [((1, 0), 'MCSM0', (5, 4))],
+ 'PO_TIMEOUT': [((1, 0), 'MCSM0', (3, 2))],
+ 'PIN_CTRL_EN': [((0, 0), 'MCSM0', (1, 1))],
+ 'XOSC_FORCE_ON': [((0, 0), 'MCSM0', (0, 0))],
+ 'FOC_BS_CS_GATE': [((0, 0), 'FOCCFG', (5, 5))],
+ 'FOC_PRE_K': [((1, 0), 'FOCCFG', (4, 3))],
+ 'FOC_POST_K': [((0, 0), 'FOCCFG', (2, 2))],
+ 'FOC_LIMIT': [((1, 0), 'FOCCFG', (1, 0))],
+ 'BS_PRE_KI': [((1, 0), 'BSCFG', (7, 6))],
+ 'BS_PRE_KP': [((1, 0), 'BSCFG', (5, 4))],
+ 'BS_POST_KI': [((0, 0), 'BSCFG', (3, 3))],
+ 'BS_POST_KP': [((0, 0), 'BSCFG', (2, 2))],
+ 'BS_LIMIT': [((1, 0), 'BSCFG', (1, 0))],
+ 'MAX_DVGA_GAIN': [((1, 0), 'AGCCTRL2', (7, 6))],
+ 'MAX_LNA_GAIN': [((2, 0), 'AGCCTRL2', (5, 3))],
+ 'MAGN_TARGET': [((2, 0), 'AGCCTRL2', (2, 0))],
+ 'AGC_LNA_PRIORITY': [((0, 0), 'AGCCTRL1', (6, 6))],
+ 'CARRIER_SENSE_REL_THR': [((1, 0), 'AGCCTRL1', (5, 4))],
+ 'CARRIER_SENSE_ABS_THR': [((3, 0), 'AGCCTRL1', (3, 0))],
+ 'HYST_LEVEL': [((1, 0), 'AGCCTRL0', (7, 6))],
+ 'WAIT_TIME': [((1, 0), 'AGCCTRL0', (5, 4))],
+ 'AGC_FREEZE': [((1, 0), 'AGCCTRL0', (3, 2))],
+ 'FILTER_LENGTH': [((1, 0), 'AGCCTRL0', (1, 0))],
+ 'EVENT0': [((15, 8), 'WOREVT1', (7, 0)), ((7, 0), 'WOREVT0', (7, 0))],
+ 'RC_PD': [((0, 0), 'WORCTRL', (7, 7))],
+ 'EVENT1': [((2, 0), 'WORCTRL', (6, 4))],
+ 'RC_CAL': [((0, 0), 'WORCTRL', (3, 3))],
+ 'WOR_RES': [((1, 0), 'WORCTRL', (1, 0))],
+ 'LNA_CURRENT': [((1, 0), 'FREND1', (7, 6))],
+ 'LNA2MIX_CURRENT': [((1, 0), 'FREND1', (5, 4))],
+ 'LODIV_BUF_CURRENT_RX': [((1, 0), 'FREND1', (3, 2))],
+ 'MIX_CURRENT': [((1, 0), 'FREND1', (1, 0))],
+ 'LODIV_BUF_CURRENT_TX': [((1, 0), 'FREND0', (5, 4))],
+ 'PA_POWER': [((2, 0), 'FREND0', (2, 0))],
+ 'FSCAL': [((23, 22), 'FSCAL3', (7, 6)),
+           ((21, 18), 'FSCAL3', (3, 0)),
+           ((17, 13), 'FSCAL2', (4, 0)),
+           ((12, 7), 'FSCAL1', (5, 0)),
+           ((6, 0), 'FSCAL0', (6, 0))],
+ 'CHP_CURR_CAL_EN': [((1, 0), 'FSCAL3', (5, 4))],
+ 'VCO_CORE_H_EN': [((0, 0), 'FSCAL2', (5, 5))],
+ 'RCCTRL1': [((6, 0), 'RCCTRL1', (6, 0))],
+ 'RCCTRL0': [((6, 0), 'RCCTRL0', (6, 0))],
+ 'FSTEST': [((7, 0), 'FSTEST', (7, 0))],
+ 'PTEST': [((7, 0), 'PTEST', (7, 0))],
+ 'AGCTEST': [((7, 0), 'AGCTEST', (7, 0))],
+ 'TEST2': [((7, 0), 'TEST2', (7, 0))],
+ 'TEST1': [((7, 0), 'TEST1', (7, 0))],
+ 'TEST0': [((6, 1), 'TEST0', (7, 2)), ((0, 0), 'TEST0', (0, 0))],
+ 'VCO_SEL_CAL_EN': [((0, 0), 'TEST0', (1, 1))]}
+
+reg2addr = {'IOCFG2': 0,
+ 'IOCFG1': 1,
+ 'IOCFG0': 2,
+ 'FIFOTHR': 3,
+ 'SYNC1': 4,
+ 'SYNC0': 5,
+ 'PKTLEN': 6,
+ 'PKTCTRL1': 7,
+ 'PKTCTRL0': 8,
+ 'ADDR': 9,
+ 'CHANNR': 10,
+ 'FSCTRL1': 11,
+ 'FSCTRL0': 12,
+ 'FREQ2': 13,
+ 'FREQ1': 14,
+ 'FREQ0': 15,
+ 'MDMCFG4': 16,
+ 'MDMCFG3': 17,
+ 'MDMCFG2': 18,
+ 'MDMCFG1': 19,
+ 'MDMCFG0': 20,
+ 'DEVIATN': 21,
+ 'MCSM2': 22,
+ 'MCSM1': 23,
+ 'MCSM0': 24,
+ 'FOCCFG': 25,
+ 'BSCFG': 26,
+ 'AGCCTRL2': 27,
+ 'AGCCTRL1': 28,
+ 'AGCCTRL0': 29,
+ 'WOREVT1': 30,
+ 'WOREVT0': 31,
+ 'WORCTRL': 32,
+ 'FREND1': 33,
+ 'FREND0': 34,
+ 'FSCAL3': 35,
+ 'FSCAL2': 36,
+ 'FSCAL1': 37,
+ 'FSCAL0': 38,
+ 'RCCTRL1': 39,
+ 'RCCTRL0': 40,
+ 'FSTEST': 41,
+ 'PTEST': 42,
+ 'AGCTEST': 43,
+ 'TEST2': 44,
+ 'TEST1': 45,
+ 'TEST0': 46}
+
+field_plans = {'GDO2_INV': ((0, 1, 6, 0),),
+ 'GDO2_CFG': ((0, 63, 0, 0),),
+ 'GDO_DS': ((1, 1, 7, 0),),
+ 'GDO1_INV': ((1, 1, 6, 0),),
+ 'GDO1_CFG': ((1, 63, 0, 0),),
+ 'TEMP_SENSOR_ENABLE': ((2, 1, 7, 0),),
+ 'GDO0_INV': ((2, 1, 6, 0),),
+ 'GDO0_CFG': ((2, 63, 0, 0),),
+ 'FIFO_THR': ((3, 15, 0, 0),),
+ 'SYNC': ((4, 255, 0, 8), (5, 255, 0, 0)),
+ 'PACKET_LENGTH': ((6, 255, 0, 0),),
+ 'PQT': ((7, 7, 5, 0),),
+ 'CRC_AUTOFLUSH': ((7, 1, 3, 0),),
+ 'APPEND_STATUS': ((7, 1, 2, 0),),
+ 'ADR_CHK': ((7, 3, 0, 0),),
+ 'WHITE_DATA': ((8, 1, 6, 0),),
+ 'PKT_FORMAT': ((8, 3, 4, 0),),
+ 'CC2400_EN': ((8, 1, 3, 0),),
+ 'CRC_EN': ((8, 1, 2, 0),),
+ 'LENGTH_CONFIG': ((8, 3, 0, 0),),
+ 'DEVICE_ADDR': ((9, 255, 0, 0),),
+ 'CHAN': ((10, 255, 0, 0),),
+ 'FREQ_IF': ((11, 31, 0, 0),),
+ 'FREQOFF': ((12, 255, 0, 0),),
+ 'FREQ': ((13, 3, 6, 22), (13, 63, 0, 16), (14, 255, 0, 8), (15, 255, 0, 0)),
+ 'CHANBW_E': ((16, 3, 6, 0),),
+ 'CHANBW_M': ((16, 3, 4, 0),),
+ 'DRATE_E': ((16, 15, 0, 0),),
+ 'DRATE_M': ((17, 255, 0, 0),),
+ 'DEM_DCFILT_OFF': ((18, 1, 7, 0),),
+ 'MOD_FORMAT': ((18, 7, 4, 0),),
+ 'MANCHESTER_EN': ((18, 1, 3, 0),),
+ 'SYNC_MODE': ((18, 7, 0, 0),),
+ 'FEC_EN': ((19, 1, 7, 0),),
+ 'NUM_PREAMBLE': ((19, 7, 4, 0),),
+ 'CHANSPC_E': ((19, 3, 0, 0),),
+ 'CHANSPC_M': ((20, 255, 0, 0),),
+ 'DEVIATION_E': ((21, 7, 4, 0),),
+ 'DEVIATION_M': ((21, 7, 0, 0),),
+ 'RX_TIME_RSSI': ((22, 1, 4, 0),),
+ 'RX_TIME_QUAL': ((22, 1, 3, 0),),
+ 'RX_TIME': ((22, 7, 0, 0),),
+ 'CCA_MODE': ((23, 3, 4, 0),),
+ 'RXOFF_MODE': ((23, 3, 2, 0),),
+ 'TXOFF_MODE': ((23, 3, 0, 0),),
+ 'FS_AUTOCAL': ((24, 3, 4, 0),),
+ 'PO_TIMEOUT': ((24, 3, 2, 0),),
+ 'PIN_CTRL_EN': ((24, 1, 1, 0),),
+ 'XOSC_FORCE_ON': ((24, 1, 0, 0),),
+ 'FOC_BS_CS_GATE': ((25, 1, 5, 0),),
+ 'FOC_PRE_K': ((25, 3, 3, 0),),
+ 'FOC_POST_K': ((25, 1, 2, 0),),
+ 'FOC_LIMIT': ((25, 3, 0, 0),),
+ 'BS_PRE_KI': ((26, 3, 6, 0),),
+ 'BS_PRE_KP': ((26, 3, 4, 0),),
+ 'BS_POST_KI': ((26, 1, 3, 0),),
+ 'BS_POST_KP': ((26, 1, 2, 0),),
+ 'BS_LIMIT': ((26, 3, 0, 0),),
+ 'MAX_DVGA_GAIN': ((27, 3, 6, 0),),
+ 'MAX_LNA_GAIN': ((27, 7, 3, 0),),
+ 'MAGN_TARGET': ((27, 7, 0, 0),),
+ 'AGC_LNA_PRIORITY': ((28, 1, 6, 0),),
+ 'CARRIER_SENSE_REL_THR': ((28, 3, 4, 0),),
+ 'CARRIER_SENSE_ABS_THR': ((28, 15, 0, 0),),
+ 'HYST_LEVEL': ((29, 3, 6, 0),),
+ 'WAIT_TIME': ((29, 3, 4, 0),),
+ 'AGC_FREEZE': ((29, 3, 2, 0),),
+ 'FILTER_LENGTH': ((29, 3, 0, 0),),
+ 'EVENT0': ((30, 255, 0, 8), (31, 255, 0, 0)),
+ 'RC_PD': ((32, 1, 7, 0),),
+ 'EVENT1': ((32, 7, 4, 0),),
+ 'RC_CAL': ((32, 1, 3, 0),),
+ 'WOR_RES': ((32, 3, 0, 0),),
+ 'LNA_CURRENT': ((33, 3, 6, 0),),
+ 'LNA2MIX_CURRENT': ((33, 3, 4, 0),),
+ 'LODIV_BUF_CURRENT_RX': ((33, 3, 2, 0),),
+ 'MIX_CURRENT': ((33, 3, 0, 0),),
+ 'LODIV_BUF_CURRENT_TX': ((34, 3, 4, 0),),
+ 'PA_POWER': ((34, 7, 0, 0),),
+ 'FSCAL': ((35, 3, 6, 22), (35, 15, 0, 18), (36, 31, 0, 13), (37, 63, 0, 7), (38, 127, 0, 0)),
+ 'CHP_CURR_CAL_EN': ((35, 3, 4, 0),),
+ 'VCO_CORE_H_EN': ((36, 1, 5, 0),),
+ 'RCCTRL1': ((39, 127, 0, 0),),
+ 'RCCTRL0': ((40, 127, 0, 0),),
+ 'FSTEST': ((41, 255, 0, 0),),
+ 'PTEST': ((42, 255, 0, 0),),
+ 'AGCTEST': ((43, 255, 0, 0),),
+ 'TEST2': ((44, 255, 0, 0),),
+ 'TEST1': ((45, 255, 0, 0),),
+ 'TEST0': ((46, 63, 2, 1), (46, 1, 0, 0)),
+ 'VCO_SEL_CAL_EN': ((46, 1, 1, 0),)}
+
+field_widths = {'GDO2_INV': 1,
+ 'GDO2_CFG': 6,
+ 'GDO_DS': 1,
+ 'GDO1_INV': 1,
+ 'GDO1_CFG': 6,
+ 'TEMP_SENSOR_ENABLE': 1,
+ 'GDO0_INV': 1,
+ 'GDO0_CFG': 6,
+ 'FIFO_THR': 4,
+ 'SYNC': 16,
+ 'PACKET_LENGTH': 8,
+ 'PQT': 3,
+ 'CRC_AUTOFLUSH': 1,
+ 'APPEND_STATUS': 1,
+ 'ADR_CHK': 2,
+ 'WHITE_DATA': 1,
+ 'PKT_FORMAT': 2,
+ 'CC2400_EN': 1,
+ 'CRC_EN': 1,
+ 'LENGTH_CONFIG': 2,
+ 'DEVICE_ADDR': 8,
+ 'CHAN': 8,
+ 'FREQ_IF': 5,
+ 'FREQOFF': 8,
+ 'FREQ': 24,
+ 'CHANBW_E': 2,
+ 'CHANBW_M': 2,
+ 'DRATE_E': 4,
+ 'DRATE_M': 8,
+ 'DEM_DCFILT_OFF': 1,
+ 'MOD_FORMAT': 3,
+ 'MANCHESTER_EN': 1,
+ 'SYNC_MODE': 3,
+ 'FEC_EN': 1,
+ 'NUM_PREAMBLE': 3,
+ 'CHANSPC_E': 2,
+ 'CHANSPC_M': 8,
+ 'DEVIATION_E': 3,
+ 'DEVIATION_M': 3,
+ 'RX_TIME_RSSI': 1,
+ 'RX_TIME_QUAL': 1,
+ 'RX_TIME': 3,
+ 'CCA_MODE': 2,
+ 'RXOFF_MODE': 2,
+ 'TXOFF_MODE': 2,
+ 'FS_AUTOCAL': 2,
+ 'PO_TIMEOUT': 2,
+ 'PIN_CTRL_EN': 1,
+ 'XOSC_FORCE_ON': 1,
+ 'FOC_BS_CS_GATE': 1,
+ 'FOC_PRE_K': 2,
+ 'FOC_POST_K': 1,
+ 'FOC_LIMIT': 2,
+ 'BS_PRE_KI': 2,
+ 'BS_PRE_KP': 2,
+ 'BS_POST_KI': 1,
+ 'BS_POST_KP': 1,
+ 'BS_LIMIT': 2,
+ 'MAX_DVGA_GAIN': 2,
+ 'MAX_LNA_GAIN': 3,
+ 'MAGN_TARGET': 3,
+ 'AGC_LNA_PRIORITY': 1,
+ 'CARRIER_SENSE_REL_THR': 2,
+ 'CARRIER_SENSE_ABS_THR': 4,
+ 'HYST_LEVEL': 2,
+ 'WAIT_TIME': 2,
+ 'AGC_FREEZE': 2,
+ 'FILTER_LENGTH': 2,
+ 'EVENT0': 16,
+ 'RC_PD': 1,
+ 'EVENT1': 3,
+ 'RC_CAL': 1,
+ 'WOR_RES': 2,
+ 'LNA_CURRENT': 2,
+ 'LNA2MIX_CURRENT': 2,
+ 'LODIV_BUF_CURRENT_RX': 2,
+ 'MIX_CURRENT': 2,
+ 'LODIV_BUF_CURRENT_TX': 2,
+ 'PA_POWER': 3,
+ 'FSCAL': 24,
+ 'CHP_CURR_CAL_EN': 2,
+ 'VCO_CORE_H_EN': 1,
+ 'RCCTRL1': 7,
+ 'RCCTRL0': 7,
+ 'FSTEST': 8,
+ 'PTEST': 8,
+ 'AGCTEST': 8,
+ 'TEST2': 8,
+ 'TEST1': 8,
+ 'TEST0': 7,
+ 'VCO_SEL_CAL_EN': 1}
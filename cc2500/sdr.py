@@ -1,5 +1,11 @@
-import subprocess
+import collections
 import struct
+import time
+import sys
+
+from .lazy import LazyModule
+
+np = LazyModule('numpy')
 
 from . import parse
 
@@ -23,17 +29,31 @@ class RawSamples:
 		self.size = size
 		self.byteorder = byteorder
 		self.signed = signed
-		self.fmt = {1: 'B', 2: 'H', 4: 'I', 8: 'L'}[size]
+		self.fmt = {1: 'B', 2: 'H', 4: 'I', 8: 'Q'}[size]
 		if signed:
 			self.fmt = self.fmt.lower()
 		self.fmtprefix = {'little': '<', 'big': '>'}[byteorder]
+		# Also a valid NumPy dtype
+		self.dtype = self.fmtprefix + self.fmt
 
 	def read(self, count):
 		data = self.f.read(self.size * count)
 		fmt = self.fmtprefix + str(len(data) // self.size) + self.fmt
 		return struct.unpack(fmt, data)
 
-def open_fm_stream(sdr, fm):
+	def readinto(self, buf):
+		"""Read samples directly into the writable buffer buf; returns the number of samples read"""
+		view = memoryview(buf).cast('B')
+		pos = 0
+		while pos < len(view):
+			n = self.f.readinto(view[pos:])
+			if not n:
+				break
+			pos += n
+		return pos // self.size
+
+def fm_stream_args(sdr, fm):
+	"""Command line for running rtl_fm"""
 	args = [
 		'rtl_fm',
 		'-f', round(fm.freq - sdr.lo),
@@ -49,11 +69,32 @@ def open_fm_stream(sdr, fm):
 	if sdr.ppm:
 		args.extend(['-p', round(sdr.ppm)])
 
-	args = list(map(str, args))
-	p = subprocess.Popen(args, stdout=subprocess.PIPE)
+	return list(map(str, args))
+
+def open_fm_stream(sdr, fm):
+	# Imported here, as it's slow to import and only needed for live decoding
+	import subprocess
+
+	p = subprocess.Popen(fm_stream_args(sdr, fm), stdout=subprocess.PIPE)
 
 	return p, RawSamples(p.stdout, 2, 'little', True)
 
+def max_frame_size(conf):
+	"""Size of the longest possible packet after the sync word, on air"""
+	size = 2 + 255 + 2
+	if conf.field.FEC_EN:
+		size = parse.fec_size(size)
+	if conf.field.MANCHESTER_EN:
+		size *= 2
+	return size
+
+def get_search_data(conf):
+	"""Preamble and sync word as they are on air, ie. as chips with Manchester encoding"""
+	preamble, sync_word = parse.get_sync_data(conf)
+	if conf.field.MANCHESTER_EN:
+		preamble, sync_word = parse.manchester_encode(preamble), parse.manchester_encode(sync_word)
+	return preamble, sync_word
+
 def binarify(data):
 	"""Binary representation of bytes, similar to hexlify()"""
 	return '{0:0{1}b}'.format(int.from_bytes(data, 'big'), len(data) * 8)
@@ -62,22 +103,81 @@ def unbinarify(data):
 	"""Bytes of binary representation, similar to unhexlify()"""
 	return int(data, 2).to_bytes(len(data) // 8, 'big')
 
-def parse_stream(f, conf, sdr, fm):
-	# Create search pattern
-	preamble, sync_word = parse.get_sync_data(conf)
-	pattern = list(map(int, binarify(preamble + sync_word)))
-
-	base_size, parse_packet = parse.make_parser(conf)
-
-	stride = round(round(fm.resamplerate) / conf.param.drate)
-	thsize = len(preamble) * 8 * stride
-	patsize = len(pattern) * stride
-	maxsize = (len(pattern) + (2 + 255 + 2) * 8) * stride
+class StreamStats:
+	"""Counters and cumulative per-stage timing for parse_stream()
+
+	If callback is given, it's called with the stats object every interval
+	seconds while parse_stream() is running.
+	"""
+	stages = ('read', 'search', 'slice', 'parse')
+	reasons = parse.ParseError.reasons + ('other',)
+
+	def __init__(self, callback=None, interval=10.0):
+		self.callback = callback
+		self.interval = interval
+		self.last_update = time.monotonic()
+
+		self.samples = 0
+		self.candidates = 0
+		self.packets = 0
+		self.violations = 0
+		self.rejects = dict.fromkeys(self.reasons, 0)
+		self.times = dict.fromkeys(self.stages, 0.0)
+
+	def reject(self, exc):
+		self.rejects[getattr(exc, 'reason', 'other')] += 1
+
+	def update(self):
+		"""Called by parse_stream() once per block"""
+		if self.callback is not None:
+			now = time.monotonic()
+			if now - self.last_update >= self.interval:
+				self.last_update = now
+				self.callback(self)
+
+	def format_text(self):
+		lines = [
+			'samples: %d' % self.samples,
+			'candidates: %d' % self.candidates,
+			'packets: %d' % self.packets,
+			'manchester violations: %d' % self.violations,
+			'rejects: ' + ' '.join('%s=%d' % item for item in self.rejects.items()),
+			'times: ' + ' '.join('%s=%.3fs' % item for item in self.times.items()),
+		]
+		return '\n'.join(lines)
+
+	def format_prometheus(self, prefix='cc2500_sdr'):
+		"""Stats in the Prometheus text exposition format"""
+		lines = []
+		def metric(name, help, values):
+			lines.append('# HELP %s_%s %s' % (prefix, name, help))
+			lines.append('# TYPE %s_%s counter' % (prefix, name))
+			lines.extend('%s_%s%s %s' % (prefix, name, labels, value) for labels, value in values)
+
+		metric('samples_total', 'Samples consumed', [('', self.samples)])
+		metric('candidates_total', 'Preamble and sync word matches', [('', self.candidates)])
+		metric('packets_total', 'Packets accepted', [('', self.packets)])
+		metric('manchester_violations_total', 'Manchester symbol violations in accepted packets', [('', self.violations)])
+		metric('rejects_total', 'Candidates rejected by the packet parser', [('{reason="%s"}' % reason, count) for reason, count in self.rejects.items()])
+		metric('stage_seconds_total', 'Time spent per decoding stage', [('{stage="%s"}' % stage, '%.6f' % t) for stage, t in self.times.items()])
+		return '\n'.join(lines) + '\n'
+
+	def format(self, fmt='text'):
+		return {'text': self.format_text, 'prometheus': self.format_prometheus}[fmt]()
+
+def _parse_stream_python(f, conf, sdr, fm, stats=None):
+	"""Reference implementation of parse_stream(), one sample at a time"""
+	decoder = get_decoder(conf, fm)
+	pattern = list(decoder.pattern)
+	base_size, parse_packet = decoder.base_size, decoder.parse
+	stride, thsize, patsize, maxsize = decoder.stride, decoder.thsize, decoder.patsize, decoder.maxsize
 
 	# Initialize window and sliding average (aka. the threshold)
 	window = list(f.read(patsize))
 	assert len(window) >= patsize >= thsize
 	threshold_sum = sum(window[:thsize-1])
+	if stats:
+		stats.samples += len(window)
 
 	while True:
 		vals = f.read(N)
@@ -86,8 +186,12 @@ def parse_stream(f, conf, sdr, fm):
 			break
 
 		window.extend(vals)
+		if stats:
+			stats.samples += len(vals)
+			stats.update()
 
-		# Count is static so that we always drop the old data at some point
+		# Count is static so that we always drop the old data at some point; a packet
+		# skipped past it carries over to the next block
 		pos = 0
 		count = len(window) - patsize + 1
 		while pos < count:
@@ -97,9 +201,15 @@ def parse_stream(f, conf, sdr, fm):
 
 			# Look for a match
 			if all((value > threshold) == bit for value, bit in zip(window[pos:pos+patsize:stride], pattern)):
+				if stats:
+					stats.candidates += 1
+
 				# Assure that there's enough data for a full packet
 				if len(window) - pos < maxsize:
-					window.extend(f.read(maxsize))
+					vals = f.read(maxsize)
+					window.extend(vals)
+					if stats:
+						stats.samples += len(vals)
 
 				# Find middle point of stride
 				data = [int(item > threshold) for item in window[pos:pos+patsize]]
@@ -118,9 +228,14 @@ def parse_stream(f, conf, sdr, fm):
 				# Parse packet and calculate skip
 				try:
 					addr, payload = parse_packet(data)
-					yield (addr, payload)
-				except:
+				except Exception as e:
 					payload = b''
+					if stats:
+						stats.reject(e)
+				else:
+					if stats:
+						stats.packets += 1
+					yield (addr, payload)
 
 				skip = (base_size + len(payload)) * 8
 				pos += skip
@@ -139,7 +254,381 @@ def parse_stream(f, conf, sdr, fm):
 			threshold_sum -= window[pos]
 			pos += 1
 
-		window = window[count:]
+		window = window[pos:]
+
+# Number of leading pattern bits checked for every position of a block before
+# narrowing down to the individual candidates
+DENSE_BITS = 8
+
+class SampleRing:
+	"""Bounded window of samples from a stream, backed by a preallocated buffer
+
+	Every sample is stored twice, size samples apart, so that any window of at
+	most size samples is available as a contiguous view without copying.
+	"""
+	def __init__(self, size, dtype):
+		self.size = size
+		self.buf = np.zeros(2 * size, dtype=dtype)
+		self.start = 0
+		self.end = 0
+
+	def __len__(self):
+		return self.end - self.start
+
+	def view(self):
+		off = self.start % self.size
+		return self.buf[off:off+len(self)]
+
+	def fill(self, f, count=None):
+		"""Read up to count samples (by default, until full) from f; returns the number read"""
+		free = self.size - len(self)
+		if count is None or count > free:
+			count = free
+
+		read = 0
+		while read < count:
+			off = self.end % self.size
+			n = f.readinto(self.buf[off:off+min(count - read, self.size - off)])
+			self.buf[off+self.size:off+self.size+n] = self.buf[off:off+n]
+			self.end += n
+			read += n
+			if not n:
+				break
+		return read
+
+	def drop(self, count):
+		self.start += min(count, len(self))
+
+class BlockSearch:
+	"""Preallocated work buffers for finding pattern matches in blocks of up to size positions"""
+	def __init__(self, size, pattern, stride, thsize, patsize):
+		self.pattern = pattern
+		self.stride = stride
+		self.thsize = thsize
+		self.patsize = patsize
+		self.csum = np.zeros(size + thsize, dtype=np.int64)
+		self.tsum = np.zeros(size, dtype=np.int64)
+		self.thresholds = np.zeros(size)
+		self.mask = np.zeros(size, dtype=bool)
+		self.bits = np.zeros(size, dtype=bool)
+
+	def search(self, window, count):
+		"""Return thresholds and match positions for the first count positions of window"""
+		thsize, stride = self.thsize, self.stride
+
+		# Sliding average for every position with a cumulative sum
+		csum = self.csum[:count+thsize]
+		np.cumsum(window[:count+thsize-1], dtype=np.int64, out=csum[1:])
+		tsum = self.tsum[:count]
+		np.subtract(csum[thsize:], csum[:count], out=tsum)
+		thresholds = self.thresholds[:count]
+		np.true_divide(tsum, self.patsize, out=thresholds)
+		np.trunc(thresholds, out=thresholds)
+
+		# Check the first bits for every position in place, then narrow down
+		# the remaining candidates bit by bit, which is equivalent to requiring
+		# a match for the whole pattern
+		mask, bits = self.mask[:count], self.bits[:count]
+		mask.fill(True)
+		for k, bit in enumerate(self.pattern[:DENSE_BITS]):
+			np.greater(window[k*stride:k*stride+count], thresholds, out=bits)
+			if not bit:
+				np.logical_not(bits, out=bits)
+			np.logical_and(mask, bits, out=mask)
+
+		idx = np.flatnonzero(mask)
+		for k in range(DENSE_BITS, len(self.pattern)):
+			if not len(idx):
+				break
+			idx = idx[(window[idx + k * stride] > thresholds[idx]) == self.pattern[k]]
+
+		return thresholds, idx
+
+def _stride_mid(window, pos, threshold, pattern, stride, patsize):
+	"""Offset of the middle point of the symbols of the pattern matched at pos"""
+	bits = window[pos:pos+patsize] > threshold
+	mid = 0
+	for i in range(1, stride):
+		mid = i // 2
+		if not np.array_equal(bits[i::stride], pattern):
+			break
+	return mid
+
+def _slice_bits(window, pos, threshold, pattern, stride, patsize, maxsize):
+	mid = _stride_mid(window, pos, threshold, pattern, stride, patsize)
+	return window[pos+mid:pos+mid+maxsize:stride] > threshold
+
+def decode_manchester_bits(chips):
+	"""Decode Manchester chips given as a bool array; returns (bits, violations)
+
+	violations is a bool array with an element for each bit, telling whether
+	its chips had no transition, in which case the first chip is used.
+	"""
+	pairs = chips[:len(chips) // 2 * 2].reshape(-1, 2)
+	return pairs[:, 0], pairs[:, 0] == pairs[:, 1]
+
+def _pack_bits(bits):
+	return np.packbits(bits[:len(bits) // 8 * 8]).tobytes()
+
+def _parse_stream_numpy(f, conf, sdr, fm, stats=None):
+	"""Block-at-a-time implementation of parse_stream() using NumPy"""
+	decoder = get_decoder(conf, fm)
+	pattern = np.array(decoder.pattern, dtype=bool)
+
+	# Manchester chips are decoded here, so the parser gets the data bits
+	manchester = decoder.manchester
+	base_size, parse_packet = decoder.base_size, decoder.parse_bits
+	stride, thsize, patsize, maxsize = decoder.stride, decoder.thsize, decoder.patsize, decoder.maxsize
+
+	# The window always holds a full packet worth of samples after each searched position
+	ring = SampleRing(N + maxsize, f.dtype)
+	search = BlockSearch(N, pattern, stride, thsize, patsize)
+
+	clock = time.perf_counter
+	t0 = clock()
+	read = ring.fill(f)
+	if stats:
+		stats.samples += read
+		stats.times['read'] += clock() - t0
+	assert len(ring) >= patsize >= thsize
+
+	# Matches before this position (relative to window) are inside the previous packet
+	skip_to = 0
+	while len(ring) >= patsize:
+		window = ring.view()
+		count = min(N, len(window) - patsize + 1)
+		t0 = clock()
+		thresholds, candidates = search.search(window, count)
+		if stats:
+			stats.times['search'] += clock() - t0
+
+		for pos in candidates.tolist():
+			if pos < skip_to:
+				continue
+
+			if stats:
+				stats.candidates += 1
+
+			t0 = clock()
+			bits = _slice_bits(window, pos, thresholds[pos], pattern, stride, patsize, maxsize)
+			if manchester:
+				bits, violations = decode_manchester_bits(bits)
+			data = _pack_bits(bits)
+			t1 = clock()
+
+			# Parse packet and calculate skip
+			try:
+				addr, payload = parse_packet(data)
+			except Exception as e:
+				payload = None
+				if stats:
+					stats.reject(e)
+			else:
+				if stats:
+					stats.packets += 1
+					if manchester:
+						stats.violations += int(violations[:(base_size + len(payload)) * 8].sum())
+
+			if stats:
+				stats.times['slice'] += t1 - t0
+				stats.times['parse'] += clock() - t1
+
+			if payload is not None:
+				yield (addr, payload)
+
+			skip_to = pos + (base_size + len(payload or b'')) * 8 + 1
+
+		ring.drop(count)
+		skip_to = max(skip_to - count, 0)
+
+		t0 = clock()
+		read = ring.fill(f)
+		if stats:
+			stats.samples += read
+			stats.times['read'] += clock() - t0
+			stats.update()
+
+def _feed_packet(parser, data, end_after, head):
+	"""Feed data to parser; returns (payload chunks, head)
+
+	head is the payload received so far while the callable end_after hasn't
+	told the payload size yet, and None after that (or if it isn't needed).
+	Until then, data is fed a byte at a time, so that the packet can't
+	overrun the size it returns.
+	"""
+	if head is None:
+		return parser.feed(data), None
+
+	chunks = []
+	for i in range(len(data)):
+		new = parser.feed(data[i:i+1])
+		if not new:
+			continue
+
+		chunks.extend(new)
+		head += new[0]
+		size = end_after(head)
+		if size is not None:
+			parser.end_after(max(size - len(head), 0))
+			chunks.extend(parser.feed(data[i+1:]))
+			return chunks, None
+
+	return chunks, head
+
+def stream_packets(f, conf, sdr, fm, end_after=None, stats=None):
+	"""Generate (addr, chunk, status) for the packets in the sample stream f as they arrive
+
+	The bytes of a packet are sliced as soon as their samples have been read
+	and fed to a parse.StreamParser, so only a block of samples is buffered
+	however long the packet is. chunk is the next part of the payload, and
+	status is None until the end of the packet, which is yielded with an
+	empty chunk and a status of 'ok', 'crc' or 'short' (if the stream ended
+	first). Packets with an invalid length or address yield nothing.
+
+	In infinite packet length mode, end_after tells where the packets end:
+	either the payload size of every packet, or a function called with the
+	payload received so far until it returns the payload size (eg. from a
+	length field of a higher level protocol). Without it, a packet lasts
+	until the stream ends. Requires NumPy; FEC and Manchester encoding are
+	not supported.
+	"""
+	decoder = get_decoder(conf, fm)
+	pattern = np.array(decoder.pattern, dtype=bool)
+	stride, thsize, patsize = decoder.stride, decoder.thsize, decoder.patsize
+
+	parser = parse.StreamParser(conf)
+	header_size = parser.length_size + parser.addr_size
+	header_errors = ('length', 'address')
+	if not parser.infinite:
+		end_after = None
+
+	ring = SampleRing(N + patsize, f.dtype)
+	search = BlockSearch(N, pattern, stride, thsize, patsize)
+
+	clock = time.perf_counter
+	t0 = clock()
+	read = ring.fill(f)
+	if stats:
+		stats.samples += read
+		stats.times['read'] += clock() - t0
+
+	# Sample positions are absolute, ie. counted from the start of the stream.
+	# While in a packet, start is the position of its first bit after the sync
+	# word and bitpos that of the next bit to slice.
+	start = bitpos = None
+	search_from = 0
+	while True:
+		window = ring.view()
+		base = ring.start
+
+		if bitpos is not None:
+			t0 = clock()
+			rel = bitpos - base
+			size = max((len(window) - rel + stride - 1) // stride // 8, 0)
+			data = _pack_bits(window[rel:rel+size*8*stride:stride] > threshold)
+			bitpos += size * 8 * stride
+			t1 = clock()
+			chunks, head = _feed_packet(parser, data, end_after, head)
+			if stats:
+				stats.times['slice'] += t1 - t0
+				stats.times['parse'] += clock() - t1
+
+			for chunk in chunks:
+				yield (parser.addr, chunk, None)
+
+			if parser.done:
+				status = parser.error or 'ok'
+				if stats:
+					if parser.error:
+						stats.reject(parse.ParseError(parser.error))
+					else:
+						stats.packets += 1
+				if status in header_errors:
+					search_from = start + header_size * 8 * stride
+				else:
+					yield (parser.addr, b'', status)
+					search_from = start + parser.pos * 8 * stride
+				start = bitpos = None
+				continue
+
+			ring.drop(bitpos - base)
+			t0 = clock()
+			read = ring.fill(f)
+			if stats:
+				stats.samples += read
+				stats.times['read'] += clock() - t0
+				stats.update()
+			if not read:
+				if parser.pos >= header_size:
+					yield (parser.addr, b'', 'short')
+				break
+			continue
+
+		rel = max(search_from - base, 0)
+		count = min(N, len(window) - patsize + 1 - rel)
+		if count > 0:
+			t0 = clock()
+			thresholds, candidates = search.search(window[rel:], count)
+			if stats:
+				stats.times['search'] += clock() - t0
+
+			if len(candidates):
+				pos = rel + int(candidates[0])
+				threshold = thresholds[pos - rel]
+				mid = _stride_mid(window, pos, threshold, pattern, stride, patsize)
+				start = bitpos = base + pos + mid + patsize
+				parser.reset()
+				if isinstance(end_after, int):
+					parser.end_after(end_after)
+				head = b'' if callable(end_after) else None
+				if stats:
+					stats.candidates += 1
+				continue
+
+			rel += count
+
+		ring.drop(rel)
+		search_from = ring.start
+		t0 = clock()
+		read = ring.fill(f)
+		if stats:
+			stats.samples += read
+			stats.times['read'] += clock() - t0
+			stats.update()
+		if len(ring) < patsize and not read:
+			break
+
+def _whole_packets(chunks):
+	"""(addr, payload) of the packets with a valid CRC from stream_packets()"""
+	payload = []
+	for addr, chunk, status in chunks:
+		payload.append(chunk)
+		if status is not None:
+			if status == 'ok':
+				yield (addr, b''.join(payload))
+			payload = []
+
+engines = {
+	'python': _parse_stream_python,
+	'numpy': _parse_stream_numpy,
+}
+
+def parse_stream(f, conf, sdr, fm, engine=None, stats=None, end_after=None):
+	"""Generate (addr, payload) for each packet found in the sample stream f
+
+	engine selects the detection implementation from engines; by default the
+	NumPy one is used if NumPy is available. If stats (a StreamStats) is
+	given, it's updated as the stream is parsed; the Python engine doesn't
+	keep stage timing.
+
+	In infinite packet length mode, the packets are sliced incrementally with
+	stream_packets() regardless of engine, and end_after is passed to it.
+	"""
+	if conf.field.LENGTH_CONFIG == 2:
+		return _whole_packets(stream_packets(f, conf, sdr, fm, end_after, stats))
+	if engine is None:
+		engine = 'numpy' if np else 'python'
+	return engines[engine](f, conf, sdr, fm, stats)
 
 def build_fm_conf(conf):
 	# XXX: These would need to be taken account in freq
@@ -156,16 +645,132 @@ def build_fm_conf(conf):
 
 	return FMConfig(freq, samplerate, resamplerate)
 
-def dump_stream(conf, sdr):
-	fm = build_fm_conf(conf)
+# Everything parse_stream() needs to know about a config, for a given FMConfig:
+# - pattern: bits of the preamble and sync word (chips, with Manchester encoding)
+# - parse: parser for the raw on-air bytes, parse_bits: for Manchester decoded data
+# - stride: samples per symbol; thsize, patsize, maxsize: sizes of the threshold
+#   window, pattern and the longest packet in samples
+Decoder = collections.namedtuple('Decoder', 'pattern base_size parse parse_bits manchester stride thsize patsize maxsize fm')
+
+def build_decoder(conf, fm=None):
+	if fm is None:
+		fm = build_fm_conf(conf)
+
+	preamble, sync_word = get_search_data(conf)
+	pattern = tuple(map(int, binarify(preamble + sync_word)))
+
+	manchester = bool(conf.field.MANCHESTER_EN)
+	# Infinite length packets are only parsed incrementally, by stream_packets()
+	base_size = parse_packet = parse_bits = None
+	if conf.field.LENGTH_CONFIG != 2:
+		base_size, parse_packet = parse.make_parser(conf)
+		parse_bits = parse.make_parser(conf, manchester=False)[1] if manchester else parse_packet
+
+	stride = round(round(fm.resamplerate) / conf.param.drate)
+	thsize = len(preamble) * 8 * stride
+	patsize = len(pattern) * stride
+	maxsize = (len(pattern) + max_frame_size(conf) * 8) * stride
+
+	return Decoder(pattern, base_size, parse_packet, parse_bits, manchester, stride, thsize, patsize, maxsize, fm)
+
+class DecoderCache:
+	"""Bounded LRU cache of build_decoder() results
+
+	Entries are keyed on the register values and fxosc of the config (and the
+	sample rate of the FMConfig, if given), so mutating a config just makes
+	it map to a different entry; invalidate() drops entries explicitly.
+	"""
+	def __init__(self, maxsize=32):
+		self.maxsize = maxsize
+		self.entries = collections.OrderedDict()
+		self.hits = 0
+		self.misses = 0
+
+	def key(self, conf, fm=None):
+		return (bytes(conf.reg_values), conf.fxosc, fm and fm.resamplerate)
+
+	def get(self, conf, fm=None):
+		key = self.key(conf, fm)
+		decoder = self.entries.get(key)
+		if decoder is not None:
+			self.hits += 1
+			self.entries.move_to_end(key)
+			return decoder
+
+		self.misses += 1
+		decoder = self.entries[key] = build_decoder(conf, fm)
+		if len(self.entries) > self.maxsize:
+			self.entries.popitem(last=False)
+		return decoder
+
+	def invalidate(self, conf=None):
+		"""Drop the entries for the current contents of conf, or all entries"""
+		if conf is None:
+			self.entries.clear()
+			return
+
+		regs = self.key(conf)[:2]
+		for key in [key for key in self.entries if key[:2] == regs]:
+			del self.entries[key]
+
+decoders = DecoderCache()
+
+def get_decoder(conf, fm=None):
+	"""Cached build_decoder()"""
+	return decoders.get(conf, fm)
+
+def dump_packets(packets):
+	for addr, payload in packets:
+		print(addr, payload)
+
+def print_stats(fmt='text'):
+	"""StreamStats callback printing the stats to stderr"""
+	def callback(stats):
+		print(stats.format(fmt), file=sys.stderr)
+	return callback
+
+def dump_stream(conf, sdr, engine=None, pipeline=None, record=None, stats=None, end_after=None):
+	"""Print packets received live with rtl_fm
+
+	With pipeline set to 'process' or 'thread', reading, detection and output
+	run as separate stages, with detection in a worker process or thread.
+	With record set, the samples are also saved to that capture file. stats
+	is a StreamStats to update and end_after the payload size in infinite
+	packet length mode (neither is supported in pipeline mode).
+	"""
+	if pipeline:
+		from .pipeline import Pipeline
+
+		stages = Pipeline(conf, sdr, engine=engine, use_process=pipeline == 'process')
+		try:
+			dump_packets(stages)
+		except KeyboardInterrupt:
+			pass
+		print(stages.format_stats())
+		return
+
+	fm = get_decoder(conf).fm
 	p, s = open_fm_stream(sdr, fm)
 
+	if record:
+		from . import capture
+		s = capture.record(record, s, conf, sdr, fm)
+
 	try:
-		for addr, payload in parse_stream(s, conf, sdr, fm):
-			print(addr, payload)
+		dump_packets(parse_stream(s, conf, sdr, fm, engine, stats, end_after))
 	except KeyboardInterrupt:
 		p.terminate()
 		p.wait()
+	finally:
+		if record:
+			s.f.close()
+
+def dump_capture(path, conf=None, engine=None, stats=None, end_after=None):
+	"""Print packets from a capture file, using the recorded config unless conf is given"""
+	from . import capture
+
+	with capture.Capture(path) as cap:
+		dump_packets(parse_stream(cap.samples, conf or cap.conf, cap.sdr, cap.fm, engine, stats, end_after))
 
 if __name__ == '__main__':
 	from optparse import OptionParser
@@ -176,17 +781,42 @@ if __name__ == '__main__':
 	parser.add_option('-l', '--lo', dest='lo', type='float', help='Downconverter LO frequency')
 	parser.add_option('-g', '--gain', dest='gain', type='float', help='RTL-SDR tuner gain')
 	parser.add_option('-p', '--ppm', dest='ppm', type='float', help='RTL-SDR ppm error')
+	parser.add_option('-e', '--engine', dest='engine', choices=sorted(engines), help='Packet detection engine')
+	parser.add_option('-P', '--pipeline', dest='pipeline', choices=['process', 'thread'], help='Run detection in a separate worker process or thread')
+	parser.add_option('-w', '--write', dest='record', metavar='FILE', help='Record samples to a capture file')
+	parser.add_option('-r', '--read', dest='replay', metavar='FILE', help='Parse packets from a capture file instead of rtl_fm')
+	parser.add_option('-i', '--stats-interval', dest='stats_interval', type='float', metavar='SECONDS', help='Print decoder statistics periodically')
+	parser.add_option('-n', '--end-after', dest='end_after', type='int', metavar='BYTES', help='Payload size of packets in infinite packet length mode')
+	parser.add_option('-f', '--stats-format', dest='stats_format', choices=['text', 'prometheus'], help='Format of the statistics')
 
-	parser.set_defaults(lo=0, gain=0, ppm=0)
+	parser.set_defaults(lo=0, gain=0, ppm=0, stats_format='text')
 
 	opts, args = parser.parse_args()
 
 	# Note: With RTL-SDR you *need* a downconverter to reach 2.4GHz
 	sdr = SDRConfig(opts.ppm, opts.lo, opts.gain)
 	if not args:
-		conf = config.CC2500Config()
+		conf = None if opts.replay else config.CC2500Config()
 	else:
 		conf = config.CC2500Config.fromhex(*args)
 
-	dump_stream(conf, sdr)
+	if opts.record and opts.pipeline:
+		parser.error('recording is not supported in pipeline mode')
+
+	if opts.end_after is not None and opts.pipeline:
+		parser.error('packet size is not supported in pipeline mode')
+
+	stats = None
+	if opts.stats_interval:
+		if opts.pipeline:
+			parser.error('statistics are not supported in pipeline mode')
+		stats = StreamStats(print_stats(opts.stats_format), opts.stats_interval)
+
+	if opts.replay:
+		dump_capture(opts.replay, conf, opts.engine, stats, opts.end_after)
+	else:
+		dump_stream(conf, sdr, opts.engine, opts.pipeline, opts.record, stats, opts.end_after)
+
+	if stats:
+		print(stats.format(opts.stats_format), file=sys.stderr)
 
@@ -0,0 +1,531 @@
+import collections
+import binascii
+import threading
+import time
+import os
+
+from . import config
+from . import control
+
+# MARCSTATE values of the states modelled, and the STATE bits of the chip status byte for them
+MARC_IDLE = 0x01
+MARC_MANCAL = 0x05
+MARC_RX = 0x0D
+MARC_RXFIFO_OVERFLOW = 0x11
+MARC_FSTXON = 0x12
+MARC_TX = 0x13
+MARC_TXFIFO_UNDERFLOW = 0x16
+
+STATUS_STATES = {
+	MARC_IDLE: 0,
+	MARC_RX: 1,
+	MARC_TX: 2,
+	MARC_FSTXON: 3,
+	MARC_MANCAL: 4,
+	MARC_RXFIFO_OVERFLOW: 6,
+	MARC_TXFIFO_UNDERFLOW: 7,
+}
+
+# Next state after a packet, by RXOFF_MODE/TXOFF_MODE
+OFF_STATES = [MARC_IDLE, MARC_FSTXON, MARC_TX, MARC_RX]
+
+FIFO_SIZE = 64
+PATABLE_SIZE = 8
+# Duration of a manual calibration (SCAL), from the datasheet
+CAL_TIME = 0.000720
+
+# Status register addresses (read with the burst bit set)
+STATUS_REGS = {
+	'PARTNUM': 0x30, 'VERSION': 0x31, 'FREQEST': 0x32, 'LQI': 0x33, 'RSSI': 0x34, 'MARCSTATE': 0x35,
+	'WORTIME1': 0x36, 'WORTIME0': 0x37, 'PKTSTATUS': 0x38, 'VCO_VC_DAC': 0x39, 'TXBYTES': 0x3A,
+	'RXBYTES': 0x3B, 'RCCTRL1_STATUS': 0x3C, 'RCCTRL0_STATUS': 0x3D,
+}
+
+# Packet on the air: start is the time its first byte after the sync word has been received
+AirPacket = collections.namedtuple('AirPacket', 'start data rssi lqi crc_ok')
+
+class SimChip:
+	"""Software model of a CC2500, driven through spi()
+
+	Models the register file (as a CC2500Config), PATABLE, single and
+	burst accesses, the command strobes, the RX and TX FIFOs and the
+	MARCSTATE transitions between IDLE, calibration, RX, TX and the FIFO
+	error states, including RXOFF_MODE/TXOFF_MODE and FIFO overflow and
+	underflow. Time is the host monotonic clock; the state is brought up to
+	date lazily at each access, byte by byte at the configured data rate.
+
+	Packets to receive are given to inject() (the bytes as they would land
+	in the RX FIFO, ie. with the length byte in variable length mode);
+	they're received only if the chip is in RX when they start. Sent
+	packets are appended to sent with the time they started, and given to
+	on_transmit(packet, start) if set (eg. to inject them to another chip
+	with at=start, to link two chips). Preamble, sync word and
+	CRC take their time on the air, but aren't otherwise modelled; the
+	CRC result of received packets is given to inject().
+	"""
+	def __init__(self, clock=time.monotonic):
+		self.clock = clock
+		self.now = clock()
+		self.air = collections.deque()
+		self.sent = []
+		self.outbox = []
+		self.on_transmit = None
+		self.missed = 0
+		# Held by spi() and inject(), which may be called from different threads
+		self.lock = threading.RLock()
+		self.reset()
+
+	def reset(self):
+		self.conf = config.CC2500Config(config.dfl_values)
+		self.patable = bytearray(PATABLE_SIZE)
+		self.patable_index = 0
+		self.rxfifo = bytearray()
+		self.txfifo = bytearray()
+		self.rx_overflow = False
+		self.tx_underflow = False
+		self.rx_packet = None
+		self.tx_packet = None
+		self.set_state(MARC_IDLE)
+
+	def set_state(self, state):
+		self.state = state
+		self.rx_packet = None
+		if state == MARC_TX:
+			self.start_tx()
+
+	# Timing
+
+	def byte_time(self):
+		"""Air time of a byte of data, with FEC and Manchester encoding halving the data rate"""
+		byte_time = 8 / self.conf.param.drate
+		if self.conf.field.FEC_EN or self.conf.field.MANCHESTER_EN:
+			byte_time *= 2
+		return byte_time
+
+	def overhead_time(self):
+		"""Air time of the preamble and sync word"""
+		return (control.PREAMBLE_BYTES[self.conf.field.NUM_PREAMBLE] + 2) * 8 / self.conf.param.drate
+
+	def inject(self, data, delay=0.0, rssi=-60.0, lqi=0x30, crc_ok=True, at=None):
+		"""Put a packet on the air, starting after delay (or at time at, if not already past)
+
+		The first byte arrives after the preamble and sync word, and the
+		packet waits for any packet still on the air.
+		"""
+		with self.lock:
+			self.advance()
+			start = self.now + delay if at is None else max(at, self.now)
+			if self.air:
+				start = max(start, self.air[-1].start + len(self.air[-1].data) * self.byte_time())
+			self.air.append(AirPacket(start + self.overhead_time(), bytes(data), rssi, lqi, crc_ok))
+		self.notify()
+
+	def notify(self):
+		"""Give the packets sent since the last call to on_transmit, outside the lock"""
+		with self.lock:
+			outbox, self.outbox = self.outbox, []
+		if self.on_transmit:
+			for start, packet in outbox:
+				self.on_transmit(packet, start)
+
+	def advance(self, at=None):
+		"""Bring the state up to the time at (by default, the current time)"""
+		now = max(self.clock() if at is None else at, self.now)
+		while True:
+			self.drop_missed()
+			event = self.next_event_time()
+			if event is None or event > now:
+				break
+			self.now = event
+			self.handle_event()
+		self.now = now
+		self.drop_missed()
+
+	def drop_missed(self):
+		"""Lose the packets that started while not listening"""
+		if self.state == MARC_RX and self.rx_packet is None:
+			return
+		while self.air and self.air[0].start <= self.now:
+			self.air.popleft()
+			self.missed += 1
+
+	def next_event_time(self):
+		if self.state == MARC_MANCAL:
+			return self.cal_end
+		if self.state == MARC_RX:
+			if self.rx_packet is not None:
+				packet, pos, start = self.rx_packet
+				return start + pos * self.rx_byte_time
+			if self.air:
+				return self.air[0].start
+		if self.state == MARC_TX:
+			return self.tx_next
+		return None
+
+	def handle_event(self):
+		if self.state == MARC_MANCAL:
+			self.set_state(MARC_IDLE)
+		elif self.state == MARC_RX:
+			if self.rx_packet is None:
+				self.start_rx()
+			else:
+				self.rx_byte()
+		elif self.state == MARC_TX:
+			self.tx_byte()
+
+	# Receiving
+
+	def start_rx(self):
+		packet = self.air.popleft()
+		data = packet.data
+		field = self.conf.field
+
+		if field.LENGTH_CONFIG == 1 and (not data or data[0] > field.PACKET_LENGTH):
+			# Discarded on length
+			return
+
+		addr = data[1 if field.LENGTH_CONFIG == 1 else 0] if len(data) > 1 else None
+		if field.ADR_CHK and addr not in {field.DEVICE_ADDR} | ({0x00} if field.ADR_CHK >= 2 else set()) | ({0xff} if field.ADR_CHK == 3 else set()):
+			return
+
+		if field.LENGTH_CONFIG == 0:
+			data = data[:field.PACKET_LENGTH].ljust(field.PACKET_LENGTH, b'\x00')
+		self.rx_byte_time = self.byte_time()
+		self.rx_packet = (packet._replace(data=data), 0, packet.start)
+
+	def rx_byte(self):
+		packet, pos, start = self.rx_packet
+		if len(self.rxfifo) >= FIFO_SIZE:
+			self.rx_overflow = True
+			self.set_state(MARC_RXFIFO_OVERFLOW)
+			return
+
+		self.rxfifo.append(packet.data[pos])
+		pos += 1
+		if pos < len(packet.data):
+			self.rx_packet = (packet, pos, start)
+			return
+
+		# End of packet
+		field = self.conf.field
+		self.rx_packet = None
+		if field.CRC_EN and not packet.crc_ok and field.CRC_AUTOFLUSH:
+			self.rxfifo.clear()
+		elif field.APPEND_STATUS:
+			rssi = round((packet.rssi + control.RSSI_OFFSET) * 2) & 0xff
+			self.rxfifo += bytes([rssi, (packet.lqi & 0x7f) | (0x80 if packet.crc_ok else 0)])
+			if len(self.rxfifo) > FIFO_SIZE:
+				del self.rxfifo[FIFO_SIZE:]
+				self.rx_overflow = True
+				self.set_state(MARC_RXFIFO_OVERFLOW)
+				return
+
+		self.set_state(OFF_STATES[field.RXOFF_MODE])
+
+	# Transmitting
+
+	def start_tx(self):
+		self.tx_packet = bytearray()
+		self.tx_byte_time = self.byte_time()
+		self.tx_start = self.now
+		self.tx_next = self.now + self.overhead_time()
+
+	def tx_byte(self):
+		if not self.txfifo and not self.tx_packet:
+			# Preamble until there's something to send
+			self.tx_next += self.tx_byte_time
+			return
+		if not self.txfifo:
+			self.tx_underflow = True
+			self.set_state(MARC_TXFIFO_UNDERFLOW)
+			return
+
+		self.tx_packet.append(self.txfifo.pop(0))
+		self.tx_next += self.tx_byte_time
+
+		field = self.conf.field
+		count = len(self.tx_packet)
+		if field.LENGTH_CONFIG == 1:
+			done = count == self.tx_packet[0] + 1
+		elif field.LENGTH_CONFIG == 0:
+			# Also ends packets sent in infinite mode, switched to fixed length for the end
+			done = count % 256 == field.PACKET_LENGTH
+		else:
+			done = False
+
+		if done:
+			packet = bytes(self.tx_packet)
+			self.sent.append((self.tx_start, packet))
+			self.outbox.append((self.tx_start, packet))
+			if field.CRC_EN:
+				self.tx_next += 2 * self.tx_byte_time
+			state = OFF_STATES[field.TXOFF_MODE]
+			if state == MARC_TX:
+				# Next packet right away
+				self.tx_packet = bytearray()
+				self.tx_start = self.tx_next
+				self.tx_next += self.overhead_time()
+			else:
+				self.set_state(state)
+
+	# SPI access
+
+	def status(self, read):
+		"""Chip status byte: state and the bytes available in the RX FIFO (read) or free in the TX FIFO"""
+		if read:
+			available = len(self.rxfifo)
+		else:
+			available = FIFO_SIZE - len(self.txfifo)
+		return (STATUS_STATES[self.state] << 4) | min(available, 15)
+
+	def strobe(self, addr):
+		state = self.state
+		if addr == 0x30:
+			# SRES
+			self.reset()
+		elif addr == 0x31:
+			# SFSTXON
+			if state == MARC_IDLE:
+				self.set_state(MARC_FSTXON)
+		elif addr == 0x33:
+			# SCAL
+			if state == MARC_IDLE:
+				self.cal_end = self.now + CAL_TIME
+				self.set_state(MARC_MANCAL)
+		elif addr == 0x34:
+			# SRX
+			if state in {MARC_IDLE, MARC_FSTXON, MARC_TX}:
+				self.set_state(MARC_RX)
+		elif addr == 0x35:
+			# STX
+			if state in {MARC_IDLE, MARC_FSTXON, MARC_RX}:
+				self.set_state(MARC_TX)
+		elif addr in {0x32, 0x36, 0x38, 0x39}:
+			# SXOFF, SIDLE, SWOR, SPWD; the low power states aren't modelled
+			self.set_state(MARC_IDLE)
+		elif addr == 0x3A:
+			# SFRX
+			if state in {MARC_IDLE, MARC_RXFIFO_OVERFLOW}:
+				self.rxfifo.clear()
+				self.rx_overflow = False
+				if state == MARC_RXFIFO_OVERFLOW:
+					self.set_state(MARC_IDLE)
+		elif addr == 0x3B:
+			# SFTX
+			if state in {MARC_IDLE, MARC_TXFIFO_UNDERFLOW}:
+				self.txfifo.clear()
+				self.tx_underflow = False
+				if state == MARC_TXFIFO_UNDERFLOW:
+					self.set_state(MARC_IDLE)
+
+	def read_status(self, addr):
+		if addr == 0x30:
+			return 0x80
+		if addr == 0x31:
+			return 0x03
+		if addr == 0x35:
+			return self.state
+		if addr == 0x3A:
+			return (0x80 if self.tx_underflow else 0) | len(self.txfifo)
+		if addr == 0x3B:
+			return (0x80 if self.rx_overflow else 0) | len(self.rxfifo)
+		return 0
+
+	def read(self, addr):
+		if addr == 0x3F:
+			return self.rxfifo.pop(0) if self.rxfifo else 0
+		if addr == 0x3E:
+			value = self.patable[self.patable_index]
+			self.patable_index = (self.patable_index + 1) % PATABLE_SIZE
+			return value
+		if addr < len(self.conf.reg_values):
+			return self.conf[addr]
+		return 0
+
+	def write(self, addr, value):
+		if addr == 0x3F:
+			if len(self.txfifo) < FIFO_SIZE:
+				self.txfifo.append(value)
+		elif addr == 0x3E:
+			self.patable[self.patable_index] = value
+			self.patable_index = (self.patable_index + 1) % PATABLE_SIZE
+		elif addr < len(self.conf.reg_values):
+			self.conf[addr] = value
+
+	def spi(self, data, at=None):
+		"""One SPI transaction (CSn held low for all of data) at time at; returns the bytes clocked out"""
+		with self.lock:
+			out = self._spi(data, at)
+		self.notify()
+		return out
+
+	def _spi(self, data, at):
+		self.advance(at)
+
+		out = bytearray()
+		i = 0
+		while i < len(data):
+			header = data[i]
+			i += 1
+			read, burst, addr = header & 0x80, header & 0x40, header & 0x3f
+			out.append(self.status(read))
+
+			if 0x30 <= addr <= 0x3D:
+				if not burst:
+					self.strobe(addr)
+				elif i < len(data):
+					# Status registers are single access only
+					out.append(self.read_status(addr))
+					i += 1
+				continue
+
+			count = len(data) - i if burst else min(len(data) - i, 1)
+			for k in range(count):
+				reg = addr + k if addr < 0x3E else addr
+				if read:
+					out.append(self.read(reg))
+				else:
+					self.write(reg, data[i+k])
+					out.append(self.status(read))
+			i += count
+
+		# The PATABLE index resets when CSn goes high
+		self.patable_index = 0
+		return bytes(out)
+
+def link(*chips, rssi=-60.0, lqi=0x30):
+	"""Connect the chips on a shared channel, each receiving what the others send"""
+	def connect(chip):
+		def on_transmit(packet, start):
+			for other in chips:
+				if other is not chip:
+					other.inject(packet, rssi=rssi, lqi=lqi, at=start)
+		return on_transmit
+
+	for chip in chips:
+		chip.on_transmit = connect(chip)
+
+class SimSerial:
+	"""In-memory serial port connected to a simulated SPI bridge and SimChip
+
+	Speaks the line protocol of control.SerialSPI: each line of hex written
+	is run as an SPI transaction, and answered with the line echoed back
+	("< HEX") and the bytes read ("> hex"). The link is modelled with baud
+	rate (10 bits per byte, each way) and latency (the round trip time of
+	the bridge, eg. USB polling), with reads blocking until the answer has
+	"arrived" or the timeout expires.
+	"""
+	def __init__(self, chip=None, baudrate=115200, latency=0.001, timeout=1):
+		self.chip = chip or SimChip()
+		self.baudrate = baudrate
+		self.latency = latency
+		self.timeout = timeout
+		self.line = b''
+		# (time of arrival, line) of the lines written, and (time available, data) of the answers, in order
+		self.input = collections.deque()
+		self.output = collections.deque()
+		self.buf = bytearray()
+		self.link_free = 0
+		self.lock = threading.Lock()
+
+	def byte_time(self):
+		return 10 / self.baudrate
+
+	def write(self, data):
+		with self.lock:
+			now = time.monotonic()
+			# Bytes go out back to back, after anything still being sent
+			sent = max(now, self.link_free) + len(data) * self.byte_time()
+			self.link_free = sent
+
+			lines = (self.line + data).split(b'\r')
+			self.line = lines.pop()
+			self.input.extend((sent + self.latency / 2, line.strip()) for line in lines if line.strip())
+			return len(data)
+
+	def take_ready(self, now=None):
+		"""Run the lines that have reached the bridge, and move the answers that have arrived by now to the read buffer
+
+		Returns the time the next answer arrives, if any are pending.
+		"""
+		now = time.monotonic() if now is None else now
+		while self.input and self.input[0][0] <= now:
+			arrival, line = self.input.popleft()
+			rx = self.chip.spi(binascii.unhexlify(line), arrival)
+			resp = b'< ' + line.upper() + b'\r\n> ' + binascii.hexlify(rx) + b'\r\n'
+			self.output.append((arrival + self.latency / 2 + len(resp) * self.byte_time(), resp))
+
+		while self.output and self.output[0][0] <= now:
+			self.buf += self.output.popleft()[1]
+
+		pending = [items[0][0] for items in (self.input, self.output) if items]
+		return min(pending) if pending else None
+
+	@property
+	def in_waiting(self):
+		with self.lock:
+			self.take_ready()
+			return len(self.buf)
+
+	def read(self, size=1):
+		deadline = None if self.timeout is None else time.monotonic() + self.timeout
+		while True:
+			with self.lock:
+				now = time.monotonic()
+				next_ready = self.take_ready(now)
+				if len(self.buf) >= size or next_ready is None or (deadline is not None and now >= deadline):
+					data = bytes(self.buf[:size])
+					del self.buf[:size]
+					return data
+
+			wait = next_ready - now
+			if deadline is not None:
+				wait = min(wait, deadline - now)
+			time.sleep(max(wait, 0))
+
+	def flush(self):
+		pass
+
+	def close(self):
+		pass
+
+class PtyBridge:
+	"""Serves a SimSerial on a pseudo terminal, for programs opening a serial port by path
+
+	path is the name of the terminal to open, eg. with serial.Serial(path).
+	"""
+	def __init__(self, serial):
+		import tty
+
+		self.serial = serial
+		self.master, self.slave = os.openpty()
+		tty.setraw(self.slave)
+		self.path = os.ttyname(self.slave)
+		self.running = True
+		self.thread = threading.Thread(target=self.run, daemon=True)
+		self.thread.start()
+
+	def run(self):
+		import select
+
+		while self.running:
+			with self.serial.lock:
+				next_ready = self.serial.take_ready()
+				out, self.serial.buf = bytes(self.serial.buf), bytearray()
+			if out:
+				os.write(self.master, out)
+
+			timeout = 0.1 if next_ready is None else max(next_ready - time.monotonic(), 0)
+			readable, writable, failed = select.select([self.master], [], [], min(timeout, 0.1))
+			if readable:
+				try:
+					data = os.read(self.master, 4096)
+				except OSError:
+					break
+				self.serial.write(data)
+
+	def close(self):
+		self.running = False
+		self.thread.join(1)
+		os.close(self.master)
+		os.close(self.slave)